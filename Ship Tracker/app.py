@@ -1,14 +1,26 @@
 import os
+import sys
 import csv
 import requests
 import json
 from flask import Flask, render_template, request, jsonify
 from dotenv import load_dotenv
 
+# Share the AIS report normalizer with the main app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from ais_reports import ReportFilter, iter_json_array, normalize_reports
+
 load_dotenv()
 
 app = Flask(__name__)
 
+TRACKED_FIELDS = (
+    'boatName', 'mmsi', 'country', 'vesselType', 'point', 'destinationName',
+    'boundingBox', 'speedKmh', 'bearingDeg', 'draughtMeters', 'lengthMeters',
+    'widthMeters', 'imo'
+)
+TRACKED_TYPES = ReportFilter(vessel_types=frozenset({'CARGO_SHIP', 'TANKER'}))
+
 def load_ocean_regions():
     regions = []
     with open('ocean_regions.csv', 'r') as f:
@@ -48,37 +60,11 @@ def get_vessels_for_region(region_name, limit=None):
         'key': API_KEY
     }
     
-    response = requests.get(url, params=params)
-    data = response.json()
-    
-    filtered_reports = []
-    for report in data.get('reports', []):
-        if report.get('vesselType') not in ['CARGO_SHIP', 'TANKER']:
-            continue
-        point = report.get('point', {})
-        if point.get('latitude', 0) == 0.0 or point.get('longitude', 0) == 0.0:
-            continue
-        
-        filtered_report = {
-            'boatName': report.get('boatName', '').upper(),
-            'mmsi': report.get('mmsi'),
-            'country': report.get('country'),
-            'vesselType': report.get('vesselType'),
-            'point': point,
-            'destinationName': report.get('destinationName', '').upper(),
-            'boundingBox': report.get('boundingBox'),
-            'speedKmh': report.get('speedKmh'),
-            'bearingDeg': report.get('bearingDeg'),
-            'draughtMeters': report.get('draughtMeters'),
-            'lengthMeters': report.get('lengthMeters'),
-            'widthMeters': report.get('widthMeters'),
-            'imo': report.get('imo')
-        }
-        filtered_reports.append(filtered_report)
-    
-    # Apply limit if specified
-    if limit and limit > 0:
-        filtered_reports = filtered_reports[:limit]
+    # Filter and project while the response is parsed, stopping once the limit is reached
+    with requests.get(url, params=params, stream=True) as response:
+        response.encoding = response.encoding or 'utf-8'
+        reports = iter_json_array(response.iter_content(chunk_size=65536, decode_unicode=True), 'reports')
+        filtered_reports = normalize_reports(reports, TRACKED_FIELDS, TRACKED_TYPES, limit or 0)
     
     return {'reports': filtered_reports}
 
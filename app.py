@@ -2,40 +2,137 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'scripts'))
 
-from flask import Flask, request, jsonify, render_template
-from searoutes import load_port_data, get_water_bodies, get_countries_by_water_body, get_ports_by_water_body_and_country, calculate_sea_route, get_route_coordinates
-from disaster import parse_gdacs_rss, get_nearby_disasters, get_events_along_route, get_disasters_with_ships, ALERT_COLORS
-from ships import get_ships_in_bbox, get_ships_for_disasters, get_ships_near_port
+from flask import Flask, Response, g, request, jsonify, render_template, send_from_directory, stream_with_context
+from searoutes import calculate_sea_route, get_route_coordinates
+from disaster import parse_gdacs_rss, gdacs_feed_version, get_nearby_disasters, get_events_along_route, get_disasters_with_ships, ALERT_COLORS
+from ships import get_ships_in_bbox, get_ships_for_disasters, get_ships_near_port, get_area_reports, get_area_snapshot, get_vessels_in_bbox, iter_vessels_in_bbox, get_vessel_changes_in_bbox, report_positions, vessel_summary
 from eca_mpa import fast_eca_mpa
 from weather_details import get_weather_forecast
 from piracy_tracker import piracy_monitor
 from check_chokepoint import get_chokepoints_on_route
 from port_details import get_port_details_data
 from vessel_details import enrich_vessel_with_origin
+from vesselfinder import vesselfinder, is_valid_mmsi
+from ais_ingest import ais_ingestor
+from track_store import track_store, TRAIL_FIELDS
+from vessel_table import vessel_table
+from snapshot_cache import snapshot_cache
+from vessel_stream import stream_vessel_deltas, stream_ndjson
+from vessel_columns import encode_vessels, VESSEL_COLUMNS_MIMETYPE
+from ais_reports import ReportFilter, parse_fields, project_vessels, summary_fields_with
+from json_provider import FastJSONProvider
+from response_cache import response_cache, file_version
+from timing import RequestTimer
+from metrics import metrics
+from profiler import profiler, is_admin
+from log_setup import configure_logging
+from port_index import port_index
+from port_locator import port_locator
 from config import Config
+import logging
 import threading
-import requests
+import time
 import pandas as pd
+import shapely
 import json
 import concurrent.futures
 from functools import partial
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__, static_folder='static')
+app.json = FastJSONProvider(app)
 
-# Load port data once at startup
-port_df = load_port_data()
+# Port data is loaded once at startup by port_index
+# Cached responses built from a dataset are keyed by the file version loaded here
+PORT_DATA_VERSION = file_version('Data/port_details.csv')
+OCEAN_REGIONS_VERSION = file_version('Data/ocean_regions.csv')
 
 ocean_regions_df = None
 try:
     ocean_regions_df = pd.read_csv('Data/ocean_regions.csv')
-    print(f"Loaded {len(ocean_regions_df)} ocean regions")
+    logger.info("Loaded %s ocean regions", len(ocean_regions_df))
 except Exception as e:
-    print(f"Error loading ocean regions: {e}")
+    logger.error("Error loading ocean regions: %s", e)
 
 # Load ECA/MPA data once at startup
-print("Loading ECA/MPA data...")
+logger.info("Loading ECA/MPA data...")
 fast_eca_mpa.load_data()
-print("ECA/MPA data loaded successfully!")
+logger.info("ECA/MPA data loaded successfully!")
+
+# Open the vessel track history fed by every AIS response; one worker writes it, the rest read
+track_store.open()
+
+# Keep the in-memory vessel table warm so vessel endpoints skip MarinePlan
+if Config.AIS_INGEST_ENABLED:
+    ais_ingestor.start()
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    g.metrics_token = metrics.start_request()
+
+@app.before_request
+def start_request_profile():
+    flag = request.headers.get('X-Profile') or request.args.get('_profile')
+    if flag and profiler.requested(flag, request.headers.get('X-Admin-Token')):
+        g.profile = profiler.start(f"{request.method} {request.path}")
+
+@app.after_request
+def finish_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        response.headers['X-Profile-Id'] = profiler.finish(profile)['id']
+    return response
+
+@app.teardown_request
+def release_request_profile(exc):
+    # after_request is skipped when the view raised
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.finish(profile)
+
+@app.after_request
+def add_server_timing(response):
+    timer = g.get('timer')
+    if timer is not None:
+        response.headers['Server-Timing'] = timer.server_timing()
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    token = g.pop('metrics_token', None)
+    if token is None:
+        return response
+    finish = partial(
+        metrics.finish_request, token, request.url_rule.rule if request.url_rule else 'unmatched',
+        request.method, response.status_code
+    )
+    started = g.metrics_started
+    calls = metrics.request_calls()
+    if response.is_streamed:
+        # SSE/NDJSON bodies run after this hook; record their time and upstream calls once sent
+        response.call_on_close(lambda: finish(time.perf_counter() - started, calls))
+    else:
+        finish(time.perf_counter() - started, calls)
+    return response
+
+@app.route('/metrics')
+def metrics_api():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/profiles')
+def list_profiles_api():
+    if not is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(profiler.list_profiles())
+
+@app.route('/admin/profiles/<path:filename>')
+def download_profile_api(filename):
+    if not is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Forbidden'}), 403
+    return send_from_directory(os.path.abspath(profiler.directory), filename, as_attachment=True)
 
 def get_intersection_geojson(intersections):
     if not intersections:
@@ -85,28 +182,78 @@ def vessel_details_page():
 
 @app.route('/api/water_bodies')
 def get_water_bodies_api():
-    water_bodies = get_water_bodies(port_df)
-    return jsonify(water_bodies)
+    return response_cache.respond('water_bodies', PORT_DATA_VERSION, lambda: port_index.water_bodies)
 
 @app.route('/api/countries/<water_body>')
 def get_countries_api(water_body):
-    countries = get_countries_by_water_body(port_df, water_body)
-    return jsonify(countries)
+    return response_cache.respond(
+        f'countries/{water_body}', PORT_DATA_VERSION,
+        lambda: port_index.get_countries(water_body)
+    )
 
 @app.route('/api/ports/<water_body>/<country_code>')
 def get_ports_api(water_body, country_code):
-    ports = get_ports_by_water_body_and_country(port_df, water_body, country_code)
-    return jsonify(ports)
+    return response_cache.respond(
+        f'ports/{water_body}/{country_code}', PORT_DATA_VERSION,
+        lambda: port_index.get_ports(water_body, country_code)
+    )
+
+@app.route('/api/port_search')
+def port_search_api():
+    try:
+        limit = min(int(request.args.get('limit', 10)), Config.PORT_SEARCH_MAX_RESULTS)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    ports = port_index.search(request.args.get('q', ''), limit)
+    return jsonify([
+        {
+            'port_code': p.port_code,
+            'port_name': p.port_name,
+            'alt_name': p.alt_name,
+            'country_code': p.country_code,
+            'water_body': p.water_body
+        }
+        for p in ports
+    ])
+
+@app.route('/api/nearest_ports')
+def nearest_ports_api():
+    """Closest ports to lat/lon: the k nearest, or every port within radius_km."""
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        k = min(int(request.args.get('k', 5)), Config.NEAREST_PORTS_MAX_RESULTS)
+        radius_km = request.args.get('radius_km')
+        radius_km = float(radius_km) if radius_km else None
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lon are required; k and radius_km must be numbers'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({'error': 'lat/lon out of range'}), 400
+    
+    if radius_km is not None and 'k' not in request.args:
+        matches = port_locator.within(lat, lon, radius_km)[:Config.NEAREST_PORTS_MAX_RESULTS]
+    else:
+        matches = port_locator.nearest(lat, lon, k=k, max_km=radius_km)
+    return jsonify([
+        {
+            'port_code': p.port_code,
+            'port_name': p.port_name,
+            'country_code': p.country_code,
+            'lat': p.lat,
+            'lon': p.lon,
+            'distance_km': round(distance, 2)
+        }
+        for p, distance in matches
+    ])
 
 @app.route('/api/ocean_regions')
 def get_ocean_regions_api():
     try:
         if ocean_regions_df is not None:
-            regions = ocean_regions_df.to_dict('records')
-            return jsonify(regions)
+            return response_cache.respond('ocean_regions', OCEAN_REGIONS_VERSION, lambda: ocean_regions_df.to_dict('records'))
         return jsonify([])
     except Exception as e:
-        print(f"Error getting ocean regions: {e}")
+        logger.error("Error getting ocean regions: %s", e)
         return jsonify([])
 
 @app.route('/api/ships/<disaster_gdacs_id>')
@@ -149,37 +296,44 @@ def calculate_route():
     data = request.json
     origin_port_code = data.get('origin_port')
     dest_port_code = data.get('dest_port')
+    # Every stage runs in a span; see add_server_timing for the header
+    timer = g.timer = RequestTimer()
     
     try:
         # Find port coordinates (FAST - keep sequential)
-        origin_port = port_df[port_df['port_code'] == origin_port_code].iloc[0]
-        dest_port = port_df[port_df['port_code'] == dest_port_code].iloc[0]
+        with timer.span('port_lookup'):
+            origin_port = port_index.get(origin_port_code)
+            dest_port = port_index.get(dest_port_code)
+        if origin_port is None or dest_port is None:
+            return jsonify({'error': 'Port not found'}), 404
         
-        origin_coords = [origin_port['lat'], origin_port['lon']]
-        dest_coords = [dest_port['lat'], dest_port['lon']]
+        origin_coords = [origin_port.lat, origin_port.lon]
+        dest_coords = [dest_port.lat, dest_port.lon]
         
         # Calculate route (FAST - keep sequential)
-        route = calculate_sea_route(origin_coords[0], origin_coords[1], dest_coords[0], dest_coords[1])
+        with timer.span('searoute'):
+            route = calculate_sea_route(origin_coords[0], origin_coords[1], dest_coords[0], dest_coords[1])
         
         if not route:
             return jsonify({'error': 'Failed to calculate route'}), 500
         
         route_coords = get_route_coordinates(route)
-        chokepoints = get_chokepoints_on_route(route_coords)
+        with timer.span('chokepoints'):
+            chokepoints = get_chokepoints_on_route(route_coords)
         
         # RUN ALL SLOW OPERATIONS IN PARALLEL
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+        with metrics.track_executor('route', concurrent.futures.ThreadPoolExecutor(max_workers=5)) as executor:
             # Submit all tasks at once
-            future_disasters = executor.submit(parse_gdacs_rss)
-            future_piracy = executor.submit(lambda: piracy_monitor.piracy_incidents)
-            future_piracy_month = executor.submit(piracy_monitor.get_current_month_summary)
+            future_disasters = executor.submit(timer.wrap('gdacs', parse_gdacs_rss))
+            future_piracy = executor.submit(timer.wrap('piracy', lambda: piracy_monitor.piracy_incidents))
+            future_piracy_month = executor.submit(timer.wrap('piracy_month', piracy_monitor.get_current_month_summary))
             future_origin_congestion = executor.submit(
-                get_ships_near_port, 
+                timer.wrap('origin_congestion', get_ships_near_port), 
                 origin_coords[0], 
                 origin_coords[1]
             )
             future_dest_congestion = executor.submit(
-                get_ships_near_port, 
+                timer.wrap('dest_congestion', get_ships_near_port), 
                 dest_coords[0], 
                 dest_coords[1]
             )
@@ -188,9 +342,10 @@ def calculate_route():
             disaster_events = future_disasters.result()
             
             # Calculate nearby disasters
-            origin_disasters = get_nearby_disasters(origin_coords[0], origin_coords[1], disaster_events)
-            dest_disasters = get_nearby_disasters(dest_coords[0], dest_coords[1], disaster_events)
-            route_disasters = get_events_along_route(route_coords, disaster_events)
+            with timer.span('disaster_match'):
+                origin_disasters = get_nearby_disasters(origin_coords[0], origin_coords[1], disaster_events)
+                dest_disasters = get_nearby_disasters(dest_coords[0], dest_coords[1], disaster_events)
+                route_disasters = get_events_along_route(route_coords, disaster_events)
             
             # Combine all disasters
             all_disasters = []
@@ -204,7 +359,7 @@ def calculate_route():
             
             # Get ships for disasters in parallel with ECA/MPA check
             future_disaster_ships = executor.submit(
-                get_ships_for_disasters, 
+                timer.wrap('disaster_ships', get_ships_for_disasters), 
                 all_disasters, 
                 Config.MARINEPLAN_API_KEY
             )
@@ -213,13 +368,13 @@ def calculate_route():
             eca_mpa_intersections = []
             if hasattr(fast_eca_mpa, 'loaded') and fast_eca_mpa.loaded and route_coords and len(route_coords) > 0:
                 future_eca_mpa = executor.submit(
-                    fast_eca_mpa.check_route_intersections, 
+                    timer.wrap('eca_mpa', fast_eca_mpa.check_route_intersections), 
                     route_coords
                 )
                 try:
                     eca_mpa_intersections = future_eca_mpa.result()
                 except Exception as e:
-                    print(f"Error checking ECA/MPA intersections: {e}")
+                    logger.error("Error checking ECA/MPA intersections: %s", e)
             
             # Collect all parallel results
             disasters_with_ships = future_disaster_ships.result()
@@ -234,13 +389,14 @@ def calculate_route():
         
         if disasters_with_ships:
             from collision_detection import collision_detector
-            for disaster_id in disasters_with_ships.keys():
-                collisions = collision_detector.get_collisions_in_disaster_area(
-                    disasters_with_ships, disaster_id
-                )
-                if collisions:
-                    collision_risk_present = True
-                    collision_count += len(collisions)
+            with timer.span('collisions'):
+                for disaster_id in disasters_with_ships.keys():
+                    collisions = collision_detector.get_collisions_in_disaster_area(
+                        disasters_with_ships, disaster_id
+                    )
+                    if collisions:
+                        collision_risk_present = True
+                        collision_count += len(collisions)
         
         # Prepare response
         response = {
@@ -286,14 +442,32 @@ def calculate_route():
             }
         }
         
+        logger.info("Route %s -> %s took %sms: %s", origin_port_code, dest_port_code, timer.total_ms(), timer.summary())
+        if data.get('timings') or request.args.get('timings'):
+            response['_timings'] = timer.as_dict()
+        
         return jsonify(response)
         
     except Exception as e:
-        print(f"Error in route calculation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in route calculation: %s", e)
         return jsonify({'error': str(e)}), 500
 
+def wants_vessel_columns():
+    return request.accept_mimetypes.best_match(['application/json', VESSEL_COLUMNS_MIMETYPE]) == VESSEL_COLUMNS_MIMETYPE
+
+def vessel_columns_response(vessels, bounds, version, snapshot_id):
+    # Metadata that the JSON body would carry travels in headers
+    return Response(
+        encode_vessels(vessels),
+        mimetype=VESSEL_COLUMNS_MIMETYPE,
+        headers={
+            'X-Vessel-Bounds': f"{bounds['sw_lat']},{bounds['sw_lon']};{bounds['ne_lat']},{bounds['ne_lon']}",
+            'X-Vessel-Version': str(version),
+            'X-Snapshot-Id': snapshot_id,
+            'Vary': 'Accept'
+        }
+    )
+
 @app.route('/api/vessels_in_area', methods=['POST'])
 def get_vessels_in_area():
     try:
@@ -321,70 +495,64 @@ def get_vessels_in_area():
             ne_lon = float(data.get('ne_lon'))
         
         limit = int(data.get('limit', 0))
+        try:
+            fields = parse_fields(data.get('fields'))
+            filters = ReportFilter.from_params(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        bounds = {
+            'sw_lat': sw_lat,
+            'sw_lon': sw_lon,
+            'ne_lat': ne_lat,
+            'ne_lon': ne_lon
+        }
         
-        bbox = f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}"
+        # Clients holding an earlier version only get what changed since then
+        if data.get('since') is not None:
+            changes = get_vessel_changes_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, str(data['since']), limit, Config.MARINEPLAN_API_KEY, fields, filters)
+            if changes is not None:
+                version, changed, removed = changes
+                return jsonify({
+                    'success': True,
+                    'delta': True,
+                    'since': str(data['since']),
+                    'version': version,
+                    'count': len(changed),
+                    'vessels': changed,
+                    'removed': removed,
+                    'bounds': bounds
+                })
         
-        url = "https://ais.marineplan.com/location/2/locations.json"
-        params = {
-            'area': bbox,
-            'moving': 1,
-            'maxage': 1800,
-            'source': 'AIS',
-            'key': Config.MARINEPLAN_API_KEY
-        }
+        # Opt-in streaming for large regions: one vessel per line as the upstream response is parsed
+        if data.get('stream') or 'application/x-ndjson' in request.headers.get('Accept', ''):
+            vessels = iter_vessels_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, limit=limit, api_key=Config.MARINEPLAN_API_KEY, fields=fields, filters=filters)
+            return Response(
+                stream_with_context(stream_ndjson(vessels)),
+                mimetype='application/x-ndjson',
+                headers={'X-Vessel-Bounds': f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}", 'X-Accel-Buffering': 'no'}
+            )
         
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        api_data = response.json()
+        # Follow-up endpoints read the cached rows, so they keep every summary field
+        vessels = get_vessels_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, limit=limit, api_key=Config.MARINEPLAN_API_KEY, fields=summary_fields_with(fields), filters=filters)
+        version = vessel_table.snapshot.token
+        snapshot_id = snapshot_cache.put(vessels, bounds)
+        filtered_reports = project_vessels(vessels, fields)
         
-        filtered_reports = []
-        for report in api_data.get('reports', []):
-            vessel_type = report.get('vesselType')
-                
-            point = report.get('point', {})
-            lat = point.get('latitude', 0)
-            lon = point.get('longitude', 0)
-            
-            if lat == 0.0 or lon == 0.0:
-                continue
-            
-            # STRICT: Verify ship is within bounds
-            if not (sw_lat <= lat <= ne_lat and sw_lon <= lon <= ne_lon):
-                continue
-            
-            filtered_report = {
-                'boatName': report.get('boatName', '').upper(),
-                'mmsi': report.get('mmsi'),
-                'country': report.get('country'),
-                'vesselType': vessel_type,
-                'point': point,
-                'destinationName': report.get('destinationName', '').upper(),
-                'speedKmh': report.get('speedKmh'),
-                'bearingDeg': report.get('bearingDeg'),
-                'draughtMeters': report.get('draughtMeters'),
-                'lengthMeters': report.get('lengthMeters'),
-                'widthMeters': report.get('widthMeters'),
-                'imo': report.get('imo')
-            }
-            filtered_reports.append(filtered_report)
-            
-            if limit > 0 and len(filtered_reports) >= limit:
-                break
+        if wants_vessel_columns():
+            return vessel_columns_response(filtered_reports, bounds, version, snapshot_id)
         
         return jsonify({
             'success': True,
+            'delta': False,
+            'version': version,
+            'snapshot_id': snapshot_id,
             'count': len(filtered_reports),
             'vessels': filtered_reports,
-            'bounds': {
-                'sw_lat': sw_lat,
-                'sw_lon': sw_lon,
-                'ne_lat': ne_lat,
-                'ne_lon': ne_lon
-            }
+            'bounds': bounds
         })
         
     except Exception as e:
-        print(f"Error fetching vessels: {e}")
+        logger.error("Error fetching vessels: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/vessels_in_custom_bbox', methods=['POST'])
@@ -399,71 +567,142 @@ def get_vessels_in_custom_bbox():
         ne_lon = float(data.get('ne_lon'))
         
         limit = int(data.get('limit', 0))
-        
-        bbox = f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}"
-        
-        url = "https://ais.marineplan.com/location/2/locations.json"
-        params = {
-            'area': bbox,
-            'moving': 1,
-            'maxage': 1800,
-            'source': 'AIS',
-            'key': Config.MARINEPLAN_API_KEY
+        try:
+            fields = parse_fields(data.get('fields'))
+            filters = ReportFilter.from_params(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        bounds = {
+            'sw_lat': sw_lat,
+            'sw_lon': sw_lon,
+            'ne_lat': ne_lat,
+            'ne_lon': ne_lon
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        api_data = response.json()
+        # Clients holding an earlier version only get what changed since then
+        if data.get('since') is not None:
+            changes = get_vessel_changes_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, str(data['since']), limit, Config.MARINEPLAN_API_KEY, fields, filters)
+            if changes is not None:
+                version, changed, removed = changes
+                return jsonify({
+                    'success': True,
+                    'delta': True,
+                    'since': str(data['since']),
+                    'version': version,
+                    'count': len(changed),
+                    'vessels': changed,
+                    'removed': removed,
+                    'bounds': bounds,
+                    'source': 'custom_bbox'
+                })
         
-        filtered_reports = []
-        for report in api_data.get('reports', []):
-            vessel_type = report.get('vesselType')
-                
-            point = report.get('point', {})
-            lat = point.get('latitude', 0)
-            lon = point.get('longitude', 0)
-            
-            if lat == 0.0 or lon == 0.0:
-                continue
-            
-            # Verify ship is within bounds
-            if not (sw_lat <= lat <= ne_lat and sw_lon <= lon <= ne_lon):
-                continue
-            
-            filtered_report = {
-                'boatName': report.get('boatName', '').upper(),
-                'mmsi': report.get('mmsi'),
-                'country': report.get('country'),
-                'vesselType': vessel_type,
-                'point': point,
-                'destinationName': report.get('destinationName', '').upper(),
-                'speedKmh': report.get('speedKmh'),
-                'bearingDeg': report.get('bearingDeg'),
-                'draughtMeters': report.get('draughtMeters'),
-                'lengthMeters': report.get('lengthMeters'),
-                'widthMeters': report.get('widthMeters'),
-                'imo': report.get('imo')
-            }
-            filtered_reports.append(filtered_report)
-            
-            if limit > 0 and len(filtered_reports) >= limit:
-                break
+        # Follow-up endpoints read the cached rows, so they keep every summary field
+        vessels = get_vessels_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, limit=limit, api_key=Config.MARINEPLAN_API_KEY, fields=summary_fields_with(fields), filters=filters)
+        version = vessel_table.snapshot.token
+        snapshot_id = snapshot_cache.put(vessels, bounds)
+        filtered_reports = project_vessels(vessels, fields)
+        
+        if wants_vessel_columns():
+            return vessel_columns_response(filtered_reports, bounds, version, snapshot_id)
         
         return jsonify({
             'success': True,
+            'delta': False,
+            'version': version,
+            'snapshot_id': snapshot_id,
             'count': len(filtered_reports),
             'vessels': filtered_reports,
-            'bounds': {
-                'sw_lat': sw_lat,
-                'sw_lon': sw_lon,
-                'ne_lat': ne_lat,
-                'ne_lon': ne_lon
-            },
+            'bounds': bounds,
             'source': 'custom_bbox'
         })
         
     except Exception as e:
-        print(f"Error fetching vessels in custom bbox: {e}")
+        logger.error("Error fetching vessels in custom bbox: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/vessel_stream')
+def vessel_stream():
+    try:
+        sw_lat = request.args.get('sw_lat', type=float)
+        sw_lon = request.args.get('sw_lon', type=float)
+        ne_lat = request.args.get('ne_lat', type=float)
+        ne_lon = request.args.get('ne_lon', type=float)
+        limit = request.args.get('limit', 0, type=int)
+        
+        if None in (sw_lat, sw_lon, ne_lat, ne_lon):
+            return jsonify({'success': False, 'error': 'Missing bounds'}), 400
+        
+        # Streams only read the ingested table. Anywhere else each tick of each open
+        # tab would be a MarinePlan call, so no stream (204 stops EventSource retrying)
+        def covered():
+            return Config.AIS_INGEST_ENABLED and vessel_table.covers(sw_lat, sw_lon, ne_lat, ne_lon)
+        
+        if not covered():
+            return Response(status=204)
+        
+        def fetch_vessels():
+            # End the stream if coverage lapses rather than falling back to MarinePlan
+            if not covered():
+                return None
+            return get_vessels_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, limit=limit, api_key=Config.MARINEPLAN_API_KEY)
+        
+        # Start from what the client loaded instead of sending it all again
+        loaded = snapshot_cache.get(request.args.get('snapshot_id'))
+        seed = loaded['vessels'] if loaded is not None else None
+        
+        return Response(
+            stream_with_context(stream_vessel_deltas(
+                fetch_vessels, seed=seed,
+                bounds={'sw_lat': sw_lat, 'sw_lon': sw_lon, 'ne_lat': ne_lat, 'ne_lon': ne_lon}
+            )),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        logger.error("Error starting vessel stream: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/vessel_clusters')
+def vessel_clusters():
+    try:
+        sw_lat = request.args.get('sw_lat', type=float)
+        sw_lon = request.args.get('sw_lon', type=float)
+        ne_lat = request.args.get('ne_lat', type=float)
+        ne_lon = request.args.get('ne_lon', type=float)
+        zoom = request.args.get('zoom', 0, type=int)
+        limit = request.args.get('limit', 0, type=int)
+        
+        if None in (sw_lat, sw_lon, ne_lat, ne_lon):
+            return jsonify({'success': False, 'error': 'Missing bounds'}), 400
+        
+        # The live table's snapshot when ingestion covers the box, so its clusters are
+        # shared; otherwise a snapshot of just the fetched box, without a table rebuild
+        snapshot = get_area_snapshot(f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}", 1, Config.MARINEPLAN_API_KEY)
+        
+        response = {
+            'success': True,
+            'version': snapshot.token,
+            'zoom': zoom,
+            'bounds': {'sw_lat': sw_lat, 'sw_lon': sw_lon, 'ne_lat': ne_lat, 'ne_lon': ne_lon}
+        }
+        
+        if zoom > Config.CLUSTER_MAX_ZOOM:
+            rows = snapshot.query_bbox(sw_lat, sw_lon, ne_lat, ne_lon, moving_only=True, limit=limit)
+            vessels = [vessel_summary(report) for report in snapshot.to_reports(rows, ref_time=time.time())]
+            response.update({'clustered': False, 'count': len(vessels), 'vessels': vessels})
+        else:
+            clusters = snapshot.clusters().query(sw_lat, sw_lon, ne_lat, ne_lon, zoom)
+            response.update({
+                'clustered': True,
+                'count': sum(cluster['count'] for cluster in clusters),
+                'clusters': clusters
+            })
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error("Error clustering vessels: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 # Add new endpoint for disasters in area
@@ -479,49 +718,32 @@ def get_disasters_in_area():
         # Get all current disasters
         disaster_events = parse_gdacs_rss()
         
-        # Get ships in the area first
-        bbox = f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}"
-        url = "https://ais.marineplan.com/location/2/locations.json"
-        params = {
-            'area': bbox,
-            'moving': 1,
-            'maxage': 1800,
-            'source': 'AIS',
-            'key': Config.MARINEPLAN_API_KEY
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        api_data = response.json()
+        # Reuse the vessels the client already loaded, refetching only if the handle expired
+        snapshot = snapshot_cache.get(data.get('snapshot_id'))
+        if snapshot is not None:
+            reports = snapshot['vessels']
+        else:
+            bbox = f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}"
+            reports = get_area_reports(bbox, moving=1, api_key=Config.MARINEPLAN_API_KEY)
         
         # Extract ship positions
-        ship_positions = []
-        for report in api_data.get('reports', []):
-            point = report.get('point', {})
-            lat = point.get('latitude', 0)
-            lon = point.get('longitude', 0)
-            if lat != 0.0 and lon != 0.0:
-                ship_positions.append((lat, lon))
+        ship_lats, ship_lons = report_positions(reports)
+        has_position = (ship_lats != 0.0) & (ship_lons != 0.0)
+        ship_lats, ship_lons = ship_lats[has_position], ship_lons[has_position]
         
         # Filter disasters that contain at least one ship
         disasters_with_ships = []
         for disaster in disaster_events:
             if not disaster.get('is_current', False):
                 continue
-                
-            has_ship_in_disaster = False
             
             # Check if any ship is in this disaster's bbox
             if disaster.get('bbox'):
                 bbox = disaster['bbox']
-                for ship_lat, ship_lon in ship_positions:
-                    if (bbox['lat_min'] <= ship_lat <= bbox['lat_max'] and
-                        bbox['lon_min'] <= ship_lon <= bbox['lon_max']):
-                        has_ship_in_disaster = True
-                        break
-            
-            if has_ship_in_disaster:
-                disasters_with_ships.append(disaster)
+                in_disaster = ((ship_lats >= bbox['lat_min']) & (ship_lats <= bbox['lat_max']) &
+                               (ship_lons >= bbox['lon_min']) & (ship_lons <= bbox['lon_max']))
+                if in_disaster.any():
+                    disasters_with_ships.append(disaster)
         
         # Get ships for disasters that have bounding boxes
         disasters_with_ship_data = get_ships_for_disasters(disasters_with_ships, Config.MARINEPLAN_API_KEY)
@@ -534,7 +756,7 @@ def get_disasters_in_area():
         })
         
     except Exception as e:
-        print(f"Error getting disasters: {e}")
+        logger.error("Error getting disasters: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/eca_mpa_in_area', methods=['POST'])
@@ -546,33 +768,21 @@ def get_eca_mpa_in_area():
         ne_lat = float(data.get('ne_lat'))
         ne_lon = float(data.get('ne_lon'))
         
-        # Get ships in the area first
-        bbox = f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}"
-        url = "https://ais.marineplan.com/location/2/locations.json"
-        params = {
-            'area': bbox,
-            'moving': 1,
-            'maxage': 1800,
-            'source': 'AIS',
-            'key': Config.MARINEPLAN_API_KEY
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        api_data = response.json()
+        # Reuse the vessels the client already loaded, refetching only if the handle expired
+        snapshot = snapshot_cache.get(data.get('snapshot_id'))
+        if snapshot is not None:
+            reports = snapshot['vessels']
+        else:
+            bbox = f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}"
+            reports = get_area_reports(bbox, moving=1, api_key=Config.MARINEPLAN_API_KEY)
         
-        # Extract ship positions as Points
-        from shapely.geometry import Point
-        ship_points = []
-        for report in api_data.get('reports', []):
-            point = report.get('point', {})
-            lat = point.get('latitude', 0)
-            lon = point.get('longitude', 0)
-            if lat != 0.0 and lon != 0.0:
-                ship_points.append(Point(lon, lat))  # Note: shapely uses (lon, lat)
+        # Extract ship positions (shapely uses lon, lat)
+        ship_lats, ship_lons = report_positions(reports)
+        has_position = (ship_lats != 0.0) & (ship_lons != 0.0)
+        ship_lats, ship_lons = ship_lats[has_position], ship_lons[has_position]
         
         eca_mpa_with_ships = []
-        if hasattr(fast_eca_mpa, 'loaded') and fast_eca_mpa.loaded and len(ship_points) > 0:
+        if hasattr(fast_eca_mpa, 'loaded') and fast_eca_mpa.loaded and len(ship_lats) > 0:
             try:
                 # Create a box path for the area
                 area_coords = [
@@ -586,14 +796,11 @@ def get_eca_mpa_in_area():
                 
                 # Filter to only areas that contain at least one ship
                 for area in all_eca_mpa:
-                    area_geometry = area['geometry']
-                    for ship_point in ship_points:
-                        if area_geometry.contains(ship_point):
-                            eca_mpa_with_ships.append(area)
-                            break  # Found a ship, move to next area
+                    if shapely.contains_xy(area['geometry'], ship_lons, ship_lats).any():
+                        eca_mpa_with_ships.append(area)
                 
             except Exception as e:
-                print(f"Error checking ECA/MPA in area: {e}")
+                logger.error("Error checking ECA/MPA in area: %s", e)
         
         return jsonify({
             'success': True,
@@ -602,7 +809,7 @@ def get_eca_mpa_in_area():
         })
         
     except Exception as e:
-        print(f"Error getting ECA/MPA: {e}")
+        logger.error("Error getting ECA/MPA: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/collisions/<disaster_gdacs_id>')
@@ -628,7 +835,7 @@ def get_collisions_for_disaster(disaster_gdacs_id):
         ships = get_ships_in_bbox(target_disaster['bbox'], Config.MARINEPLAN_API_KEY)
         
         # Convert to Vessel objects and detect collisions
-        from collision_detection import collision_detector, Vessel
+        from collision_detection import collision_detector, collision_to_dict, Vessel
         
         vessels = []
         for ship in ships:
@@ -640,106 +847,96 @@ def get_collisions_for_disaster(disaster_gdacs_id):
                 speed_kmh=ship.get('speedKmh', 0),
                 bearing_deg=ship.get('bearingDeg', 0),
                 length_meters=ship.get('lengthMeters'),
-                width_meters=ship.get('widthMeters')
+                width_meters=ship.get('widthMeters'),
+                time_sec_utc=ship.get('timeSecUtc')
             )
             vessels.append(vessel)
         
         collisions = collision_detector.detect_collisions(vessels)
         
-        # Convert to JSON-serializable format
-        collisions_data = []
-        for collision in collisions:
-            collisions_data.append({
-                'vessel_a': {
-                    'mmsi': collision.vessel_a.mmsi,
-                    'name': collision.vessel_a.name,
-                    'lat': collision.vessel_a.lat,
-                    'lon': collision.vessel_a.lon,
-                    'speed_kmh': collision.vessel_a.speed_kmh,
-                    'bearing_deg': collision.vessel_a.bearing_deg
-                },
-                'vessel_b': {
-                    'mmsi': collision.vessel_b.mmsi,
-                    'name': collision.vessel_b.name,
-                    'lat': collision.vessel_b.lat,
-                    'lon': collision.vessel_b.lon,
-                    'speed_kmh': collision.vessel_b.speed_kmh,
-                    'bearing_deg': collision.vessel_b.bearing_deg
-                },
-                'cpa_km': round(collision.cpa_km, 3),
-                'tcpa_minutes': round(collision.tcpa_minutes, 1),
-                'risk_level': collision.risk_level
-            })
+        collisions_data = [collision_to_dict(collision) for collision in collisions]
         
         return jsonify(collisions_data)
         
     except Exception as e:
-        print(f"Error calculating collisions: {e}")
+        logger.error("Error calculating collisions: %s", e)
         return jsonify([])
 
 @app.route('/api/chokepoint_collisions', methods=['POST'])
 def get_chokepoint_collisions():
     try:
         data = request.json
-        ships = data.get('ships', [])
+        ships = data.get('ships')
         
-        from collision_detection import collision_detector, Vessel
+        from collision_detection import collision_detector, collision_to_dict, vessels_from_reports
         
-        vessels = []
-        for ship in ships:
-            # Skip stationary ships
-            speed = ship.get('speedKmh')
-            if speed is None or speed == 0:
-                continue
-            
-            if (ship.get('point') and 
-                ship['point'].get('latitude') and 
-                ship['point'].get('longitude') and
-                ship.get('bearingDeg') is not None):
-                
-                vessels.append(Vessel(
-                    mmsi=ship.get('mmsi', 'Unknown'),
-                    name=ship.get('boatName', 'Unknown'),
-                    lat=ship['point']['latitude'],
-                    lon=ship['point']['longitude'],
-                    speed_kmh=speed,
-                    bearing_deg=ship.get('bearingDeg', 0),
-                    length_meters=ship.get('lengthMeters'),
-                    width_meters=ship.get('widthMeters')
-                ))
+        # Prefer the server-side snapshot of the chokepoint ships over a posted list
+        snapshot = snapshot_cache.get(data.get('snapshot_id'))
+        if snapshot is not None:
+            ships = snapshot['vessels']
+        elif ships is None and data.get('snapshot_id'):
+            return jsonify({'error': 'Snapshot expired'}), 410
+        
+        # Skips stationary ships and ships without a position or bearing
+        vessels = vessels_from_reports(ships or [])
         
         collisions = collision_detector.detect_collisions(vessels)
         
-        collisions_data = []
-        for collision in collisions:
-            collisions_data.append({
-                'vessel_a': {
-                    'mmsi': collision.vessel_a.mmsi,
-                    'name': collision.vessel_a.name,
-                    'lat': collision.vessel_a.lat,
-                    'lon': collision.vessel_a.lon,
-                    'speed_kmh': collision.vessel_a.speed_kmh,
-                    'bearing_deg': collision.vessel_a.bearing_deg
-                },
-                'vessel_b': {
-                    'mmsi': collision.vessel_b.mmsi,
-                    'name': collision.vessel_b.name,
-                    'lat': collision.vessel_b.lat,
-                    'lon': collision.vessel_b.lon,
-                    'speed_kmh': collision.vessel_b.speed_kmh,
-                    'bearing_deg': collision.vessel_b.bearing_deg
-                },
-                'cpa_km': round(collision.cpa_km, 3),
-                'tcpa_minutes': round(collision.tcpa_minutes, 1),
-                'risk_level': collision.risk_level
-            })
+        collisions_data = [collision_to_dict(collision) for collision in collisions]
         
         return jsonify(collisions_data)
         
     except Exception as e:
-        print(f"Error calculating chokepoint collisions: {e}")
+        logger.error("Error calculating chokepoint collisions: %s", e)
         return jsonify([])
 
+@app.route('/api/vessel_trail/<mmsi>')
+def get_vessel_trail_api(mmsi):
+    try:
+        hours = request.args.get('hours', Config.TRAIL_DEFAULT_HOURS, type=float)
+        trail = track_store.get_trail(int(mmsi), hours)
+        
+        if trail is None:
+            return jsonify({'success': False, 'error': 'No track history for this vessel'}), 404
+        
+        return jsonify({
+            'success': True,
+            'mmsi': mmsi,
+            'hours': hours,
+            'fields': TRAIL_FIELDS,
+            'count': len(trail),
+            'points': trail
+        })
+        
+    except Exception as e:
+        logger.error("Error getting vessel trail: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/vessel_trails', methods=['POST'])
+def get_vessel_trails_api():
+    try:
+        data = request.json
+        sw_lat = float(data.get('sw_lat'))
+        sw_lon = float(data.get('sw_lon'))
+        ne_lat = float(data.get('ne_lat'))
+        ne_lon = float(data.get('ne_lon'))
+        hours = float(data.get('hours', Config.TRAIL_DEFAULT_HOURS))
+        limit = int(data.get('limit', 0))
+        
+        trails = track_store.get_trails_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, hours, limit)
+        
+        return jsonify({
+            'success': True,
+            'hours': hours,
+            'fields': TRAIL_FIELDS,
+            'count': len(trails),
+            'trails': trails
+        })
+        
+    except Exception as e:
+        logger.error("Error getting vessel trails: %s", e)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/weather')
 def get_weather_api():
     lat = request.args.get('lat', type=float)
@@ -759,96 +956,86 @@ def get_weather_api():
 def vessel_tracking():
     return render_template('vessel_tracking.html')
 
+def filter_current_disasters(disasters):
+    current_disasters = []
+    for disaster in disasters:
+        # Check if the disaster is still current
+        if disaster.get('is_current', False):
+            if disaster.get('to_date'):
+                from datetime import datetime
+                try:
+                    # Parse the date string
+                    to_date_str = disaster['to_date']
+                    to_date = datetime.strptime(to_date_str, '%a, %d %b %Y %H:%M:%S %Z')
+                    current_time = datetime.utcnow()
+                    
+                    if to_date < current_time:
+                        logger.debug("Skipping ended disaster: %s (ended on %s)", disaster['title'], to_date)
+                        continue
+                except ValueError as e:
+                    logger.error("Error parsing date %s: %s", disaster['to_date'], e)
+                    pass
+                    
+            current_disasters.append(disaster)
+            
+    logger.info("Returning %s current disasters (filtered from %s)", len(current_disasters), len(disasters))
+    return current_disasters
+
 @app.route('/api/disasters')
 def get_disasters_api():
     try:
-        disasters = parse_gdacs_rss()        
-        current_disasters = []
-        for disaster in disasters:
-            # Check if the disaster is still current
-            if disaster.get('is_current', False):
-                if disaster.get('to_date'):
-                    from datetime import datetime
-                    try:
-                        # Parse the date string
-                        to_date_str = disaster['to_date']
-                        to_date = datetime.strptime(to_date_str, '%a, %d %b %Y %H:%M:%S %Z')
-                        current_time = datetime.utcnow()
-                        
-                        if to_date < current_time:
-                            print(f"Skipping ended disaster: {disaster['title']} (ended on {to_date})")
-                            continue
-                    except ValueError as e:
-                        print(f"Error parsing date {disaster['to_date']}: {e}")
-                        pass
-                
-                current_disasters.append(disaster)
-        
-        print(f"Returning {len(current_disasters)} current disasters (filtered from {len(disasters)})")
-        return jsonify(current_disasters)
+        disasters = parse_gdacs_rss()
+        # The ended-disaster filter depends on the clock too, so the cached body also expires with the feed TTL
+        version = f"{gdacs_feed_version()}:{int(time.time() // Config.GDACS_CACHE_TTL_SEC)}"
+        return response_cache.respond('disasters', version, partial(filter_current_disasters, disasters))
         
     except Exception as e:
-        print(f"Error getting disasters: {e}")
+        logger.error("Error getting disasters: %s", e)
         return jsonify([])
 
 @app.route('/api/detect_collisions', methods=['POST'])
 def detect_collisions_api():
     try:
         data = request.json
-        vessels = data.get('vessels', [])
+        vessels = data.get('vessels')
         
-        from collision_detection import collision_detector, Vessel
+        from collision_detection import collision_detector, collision_to_dict, vessels_from_reports, Vessel
         
-        # Convert to Vessel objects
-        vessel_objects = []
-        for v in vessels:
-            # Skip stationary ships
-            speed = v.get('speed_kmh')
-            if speed is None or speed == 0:
-                continue
+        # Prefer the server-side snapshot of the loaded vessels over a posted list
+        snapshot = snapshot_cache.get(data.get('snapshot_id'))
+        if snapshot is not None:
+            vessel_objects = vessels_from_reports(snapshot['vessels'])
+        elif vessels is None and data.get('snapshot_id'):
+            return jsonify({'error': 'Snapshot expired'}), 410
+        else:
+            # Convert to Vessel objects
+            vessel_objects = []
+            for v in vessels or []:
+                # Skip stationary ships
+                speed = v.get('speed_kmh')
+                if speed is None or speed == 0:
+                    continue
             
-            vessel = Vessel(
-                mmsi=v.get('mmsi', 'Unknown'),
-                name=v.get('name', 'Unknown'),
-                lat=v['lat'],
-                lon=v['lon'],
-                speed_kmh=speed,
-                bearing_deg=v['bearing_deg']
-            )
-            vessel_objects.append(vessel)
+                vessel = Vessel(
+                    mmsi=v.get('mmsi', 'Unknown'),
+                    name=v.get('name', 'Unknown'),
+                    lat=v['lat'],
+                    lon=v['lon'],
+                    speed_kmh=speed,
+                    bearing_deg=v['bearing_deg'],
+                    time_sec_utc=v.get('time_sec_utc')
+                )
+                vessel_objects.append(vessel)
         
         # Detect collisions
         collisions = collision_detector.detect_collisions(vessel_objects)
         
-        # Convert to JSON-serializable format
-        collisions_data = []
-        for collision in collisions:
-            collisions_data.append({
-                'vessel_a': {
-                    'mmsi': collision.vessel_a.mmsi,
-                    'name': collision.vessel_a.name,
-                    'lat': collision.vessel_a.lat,
-                    'lon': collision.vessel_a.lon,
-                    'speed_kmh': collision.vessel_a.speed_kmh,
-                    'bearing_deg': collision.vessel_a.bearing_deg
-                },
-                'vessel_b': {
-                    'mmsi': collision.vessel_b.mmsi,
-                    'name': collision.vessel_b.name,
-                    'lat': collision.vessel_b.lat,
-                    'lon': collision.vessel_b.lon,
-                    'speed_kmh': collision.vessel_b.speed_kmh,
-                    'bearing_deg': collision.vessel_b.bearing_deg
-                },
-                'cpa_km': round(collision.cpa_km, 3),
-                'tcpa_minutes': round(collision.tcpa_minutes, 1),
-                'risk_level': collision.risk_level
-            })
+        collisions_data = [collision_to_dict(collision) for collision in collisions]
         
         return jsonify(collisions_data)
         
     except Exception as e:
-        print(f"Error detecting collisions: {e}")
+        logger.error("Error detecting collisions: %s", e)
         return jsonify([])
 
 @app.route('/api/chokepoint_ships', methods=['POST'])
@@ -862,6 +1049,7 @@ def get_chokepoint_ships():
         return jsonify({'ships': {}})
 
     all_chokepoint_ships = {}
+    snapshot_ids = {}
     
     for cp in chokepoints:
         lat = cp.get('lat')
@@ -874,48 +1062,23 @@ def get_chokepoint_ships():
         # Get ALL ships within 10km
         bbox = calculate_bbox_around_point(lat, lon, 80)
         
-        url = "https://ais.marineplan.com/location/2/locations.json"
-        params = {
-            'area': bbox,
-            'maxage': 1800,
-            'source': 'AIS',
-            'key': Config.MARINEPLAN_API_KEY
-        }
-        
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            api_data = response.json()
+            reports = get_area_reports(bbox, moving=None, api_key=Config.MARINEPLAN_API_KEY)
             
-            ships = []
-            for report in api_data.get('reports', []):
-                point = report.get('point', {})
-                if point.get('latitude', 0) == 0.0 or point.get('longitude', 0) == 0.0:
-                    continue
-                
-                ship_info = {
-                    'boatName': report.get('boatName', '').upper(),
-                    'mmsi': report.get('mmsi'),
-                    'country': report.get('country'),
-                    'vesselType': report.get('vesselType'),
-                    'point': point,
-                    'destinationName': report.get('destinationName', '').upper(),
-                    'speedKmh': report.get('speedKmh'),
-                    'bearingDeg': report.get('bearingDeg'),
-                    'draughtMeters': report.get('draughtMeters'),
-                    'lengthMeters': report.get('lengthMeters'),
-                    'widthMeters': report.get('widthMeters'),
-                    'imo': report.get('imo')
-                }
-                ships.append(ship_info)
+            ships = [
+                vessel_summary(report) for report in reports
+                if (report.get('point') or {}).get('latitude', 0) != 0.0
+                and (report.get('point') or {}).get('longitude', 0) != 0.0
+            ]
             
             all_chokepoint_ships[name] = ships
+            snapshot_ids[name] = snapshot_cache.put(ships)
             
         except Exception as e:
-            print(f"Error fetching ships for {name}: {e}")
+            logger.error("Error fetching ships for %s: %s", name, e)
             all_chokepoint_ships[name] = []
     
-    return jsonify({'ships': all_chokepoint_ships})
+    return jsonify({'ships': all_chokepoint_ships, 'snapshot_ids': snapshot_ids})
 
 @app.route('/api/port_details/<port_code>')
 def get_port_details_api(port_code):
@@ -924,7 +1087,7 @@ def get_port_details_api(port_code):
         from weather_details import get_weather_forecast
         
         result = get_port_details_data(
-            port_df=port_df,
+            port_index=port_index,
             port_code=port_code,
             weather_func=get_weather_forecast
         )
@@ -935,7 +1098,7 @@ def get_port_details_api(port_code):
         return jsonify(result)
         
     except Exception as e:
-        print(f"Error in port details API: {e}")
+        logger.error("Error in port details API: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/country_flag/<country_code>')
@@ -968,7 +1131,7 @@ def get_country_flag(country_code):
         return jsonify({'success': False, 'error': 'SVG file not found'})
         
     except Exception as e:
-        print(f"Error loading flag: {e}")
+        logger.error("Error loading flag: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/find_country_code/<path:country_name>')
@@ -985,11 +1148,11 @@ def find_country_code(country_name):
                     'country_code': code
                 })
         
-        print(f"Country not found: {country_name}")
+        logger.info("Country not found: %s", country_name)
         return jsonify({'success': False, 'error': 'Country not found'})
         
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Error: %s", e)
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/vessel_details/<mmsi>', methods=['POST'])
@@ -1003,29 +1166,31 @@ def get_vessel_details_api(mmsi):
         # Enrich with origin name from VesselFinder
         enriched_vessel = enrich_vessel_with_origin(vessel_data, mmsi)
         
-        # Look up destination port name from port_df
-        if enriched_vessel.get('destinationName'):
-            dest_code = enriched_vessel['destinationName'].replace('_', ' ').strip()
-            
-            # Try exact match first
-            matching_port = port_df[port_df['port_code'] == dest_code]
-            
-            # If no match and code has no spaces, try adding a space before last 3 chars
-            if matching_port.empty and ' ' not in dest_code and len(dest_code) >= 5:
-                # Convert MACAS -> MA CAS
-                formatted_code = dest_code[:-3] + ' ' + dest_code[-3:]
-                matching_port = port_df[port_df['port_code'] == formatted_code]
-                if not matching_port.empty:
-                    dest_code = formatted_code  # Use the formatted version
-            
-            if not matching_port.empty:
-                enriched_vessel['destinationPortName'] = matching_port.iloc[0]['port_name']
+        # Look up destination port name; the index also matches MACAS to MA CAS
+        dest_port = port_index.get(enriched_vessel.get('destinationName'))
+        if dest_port is not None:
+            enriched_vessel['destinationPortName'] = dest_port.port_name
         
         return jsonify({'vessel': enriched_vessel})
         
     except Exception as e:
-        print(f"Error in vessel details API: {e}")
+        logger.error("Error in vessel details API: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/vessel_origins', methods=['POST'])
+def vessel_origins_api():
+    """Origin names for a list of MMSIs, fetched concurrently where not cached."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object with an mmsis list'}), 400
+    mmsis = data.get('mmsis')
+    if not isinstance(mmsis, list) or not mmsis:
+        return jsonify({'error': 'mmsis must be a non-empty list'}), 400
+    if len(mmsis) > Config.VESSELFINDER_BATCH_MAX:
+        return jsonify({'error': f'At most {Config.VESSELFINDER_BATCH_MAX} MMSIs per request'}), 400
+    if not all(is_valid_mmsi(m) for m in mmsis):
+        return jsonify({'error': 'mmsis must be 9-digit integers'}), 400
+    return jsonify({'origins': vesselfinder.get_origins(mmsis)})
+
 if __name__ == '__main__':
     app.run(debug=Config.DEBUG, host=Config.HOST, port=Config.PORT)
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""Compare Flask's default JSON provider with FastJSONProvider on a route-sized payload.
+
+Run from the repository root:  python benchmarks/json_encoding.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from json_provider import FastJSONProvider, orjson
+
+def typical_route_response(n_coords=4000, n_disasters=20, ships_per_disaster=150, n_incidents=250):
+    """Synthetic /api/route response with the same shape and value types."""
+    rng = np.random.default_rng(0)
+    coords = np.cumsum(rng.normal(0, 0.05, (n_coords, 2)), axis=0)
+
+    def ship(i):
+        return {
+            'boatName': f'VESSEL {i}', 'mmsi': int(200000000 + i), 'country': 'Panama',
+            'vesselType': 'CARGO_SHIP', 'point': {'latitude': float(rng.uniform(-60, 60)), 'longitude': float(rng.uniform(-180, 180))},
+            'destinationName': 'SGSIN', 'speedKmh': float(rng.uniform(0, 40)), 'bearingDeg': float(rng.uniform(0, 360)),
+            'draughtMeters': 9.5, 'lengthMeters': 180.0, 'widthMeters': 30.0, 'imo': 9000000 + i, 'timeSecUtc': 1700000000 + i
+        }
+
+    disasters = [
+        {'gdacs_id': f'EQ{i}', 'title': f'Earthquake {i}', 'event_type': 'EQ', 'alert_level': 'Orange',
+         'lat': float(rng.uniform(-60, 60)), 'lon': float(rng.uniform(-180, 180)), 'distance_km': np.float64(rng.uniform(0, 500))}
+        for i in range(n_disasters)
+    ]
+    now = datetime.now(timezone.utc)
+    incidents = [
+        {'date': (now - timedelta(days=i % 150)).strftime('%Y-%m-%d'), 'incident_date': now - timedelta(days=i % 150),
+         'lat': float(rng.uniform(-10, 20)), 'lon': float(rng.uniform(40, 110)), 'incident_type': 'Boarded'}
+        for i in range(n_incidents)
+    ]
+    # Port coordinates come out of port_df as NumPy floats
+    origin = {'name': 'SINGAPORE', 'code': 'SGSIN', 'lat': np.float64(1.29), 'lon': np.float64(103.85)}
+
+    return {
+        'origin': origin,
+        'destination': dict(origin, name='ROTTERDAM', code='NLRTM', lat=np.float64(51.95), lon=np.float64(4.14)),
+        'route': {'coordinates': coords.tolist(), 'length': np.float64(15000.0), 'units': 'km', 'disasters': disasters},
+        'ships': {
+            d['gdacs_id']: {'disaster_info': {'title': d['title']}, 'ships': [ship(i) for i in range(ships_per_disaster)]}
+            for d in disasters
+        },
+        'piracy': {'incidents_near_route': n_incidents, 'incidents': incidents}
+    }
+
+def main(repeat=20):
+    app = Flask(__name__)
+    payload = typical_route_response()
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    with app.app_context():
+        default_sec = min(timeit.repeat(lambda: default_provider.response(payload), number=1, repeat=repeat))
+        fast_sec = min(timeit.repeat(lambda: fast_provider.response(payload), number=1, repeat=repeat))
+        size = len(fast_provider.response(payload).get_data())
+
+    print(f"Payload: {size / 1024:.0f} KB ({'orjson' if orjson else 'fallback encoder'})")
+    print(f"Default provider: {default_sec * 1000:.1f} ms")
+    print(f"Fast provider:    {fast_sec * 1000:.1f} ms")
+    print(f"Saved per response: {(default_sec - fast_sec) * 1000:.1f} ms ({default_sec / fast_sec:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+import pandas as pd
+from config import Config
+from ships import fetch_ais_reports
+from vessel_table import vessel_table
+
+logger = logging.getLogger(__name__)
+
+class AISIngestor:
+    """Polls the configured ocean regions in the background and keeps the
+    global vessel table fresh, so endpoints can answer without calling
+    MarinePlan inside the request."""
+
+    def __init__(self, table, regions_file=None, interval_sec=None):
+        self.table = table
+        self.regions_file = regions_file or Config.AIS_INGEST_REGIONS_FILE
+        self.interval_sec = interval_sec or Config.AIS_INGEST_INTERVAL_SEC
+        self.include_stationary = Config.AIS_INGEST_INCLUDE_STATIONARY
+        self.regions = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def load_regions(self):
+        try:
+            df = pd.read_csv(self.regions_file)
+            self.regions = [
+                (row['name'], (float(row['min_Y']), float(row['min_X']), float(row['max_Y']), float(row['max_X'])))
+                for _, row in df.iterrows()
+            ]
+            logger.info("AIS ingestion will poll %s regions", len(self.regions))
+        except Exception as e:
+            logger.error("Error loading ingestion regions: %s", e)
+            self.regions = []
+
+    def poll_region(self, name, bbox):
+        sw_lat, sw_lon, ne_lat, ne_lon = bbox
+        fetched_at = time.time()
+        reports = fetch_ais_reports(
+            f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}",
+            moving=0 if self.include_stationary else 1,
+            timeout=30
+        )
+        self.table.upsert_reports(reports, seen_at=fetched_at)
+        self.table.rebuild()
+        self.table.mark_covered(name, bbox, self.include_stationary, fetched_at)
+        return len(reports)
+
+    def poll_once(self):
+        for name, bbox in self.regions:
+            if self._stop.is_set():
+                return
+            try:
+                self.poll_region(name, bbox)
+            except Exception as e:
+                logger.error("Error ingesting AIS for region %s: %s", name, e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            self.poll_once()
+            logger.info("AIS ingestion pass done: %s vessels in %.1fs", len(self.table.snapshot), time.time() - started)
+            self._stop.wait(max(0.0, self.interval_sec - (time.time() - started)))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if not self.regions:
+            self.load_regions()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='ais-ingest', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+# Global instance
+ais_ingestor = AISIngestor(vessel_table)
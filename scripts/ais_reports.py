@@ -0,0 +1,166 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence
+
+# Kept free of app imports so the standalone Ship Tracker can share it.
+
+# Fields of the vessel summaries served to the maps
+SUMMARY_FIELDS = (
+    'boatName', 'mmsi', 'country', 'vesselType', 'point', 'destinationName',
+    'speedKmh', 'bearingDeg', 'draughtMeters', 'lengthMeters', 'widthMeters',
+    'imo', 'timeSecUtc'
+)
+
+# Everything the vessel details page can display
+DETAIL_FIELDS = SUMMARY_FIELDS + (
+    'boundingBox', 'callSign', 'etaSecUtc', 'destination', 'heightMeters',
+    'id', 'fuelType', 'captain', 'phone', 'atis'
+)
+
+UPPERCASE_FIELDS = {'boatName', 'destinationName'}
+
+def parse_fields(value, default: Sequence[str] = SUMMARY_FIELDS) -> Sequence[str]:
+    """Parse a fields= projection given as a list or comma separated string."""
+    if not value:
+        return default
+    if isinstance(value, str):
+        value = value.split(',')
+    fields = tuple(f.strip() for f in value if f and f.strip())
+    unknown = [f for f in fields if f not in DETAIL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown vessel fields: {', '.join(unknown)}")
+    return fields or default
+
+@dataclass(frozen=True)
+class ReportFilter:
+    vessel_types: Optional[FrozenSet[str]] = None
+    min_speed_kmh: Optional[float] = None
+    min_length_m: Optional[float] = None
+    max_length_m: Optional[float] = None
+    moving_only: bool = False
+    require_position: bool = True
+
+    @classmethod
+    def from_params(cls, params: Dict) -> 'ReportFilter':
+        """Build a filter from request JSON or query args."""
+        def number(key):
+            value = params.get(key)
+            return None if value in (None, '') else float(value)
+
+        types = params.get('vessel_types')
+        if isinstance(types, str):
+            types = types.split(',')
+        moving = params.get('moving_only')
+        if isinstance(moving, str):
+            moving = moving.lower() in ('1', 'true', 'yes')
+        return cls(
+            vessel_types=frozenset(t.strip().upper() for t in types if t.strip()) if types else None,
+            min_speed_kmh=number('min_speed_kmh'),
+            min_length_m=number('min_length_m'),
+            max_length_m=number('max_length_m'),
+            moving_only=bool(moving)
+        )
+
+    @property
+    def is_empty(self) -> bool:
+        return (self.vessel_types is None and self.min_speed_kmh is None and self.min_length_m is None
+                and self.max_length_m is None and not self.moving_only)
+
+    def matches(self, report: Dict) -> bool:
+        if self.require_position:
+            point = report.get('point') or {}
+            if (point.get('latitude', 0) or 0) == 0.0 or (point.get('longitude', 0) or 0) == 0.0:
+                return False
+        if self.vessel_types is not None and report.get('vesselType') not in self.vessel_types:
+            return False
+        speed = report.get('speedKmh') or 0
+        if self.moving_only and speed <= 0:
+            return False
+        if self.min_speed_kmh is not None and speed < self.min_speed_kmh:
+            return False
+        if self.min_length_m is not None or self.max_length_m is not None:
+            length = report.get('lengthMeters')
+            if length is None:
+                return False
+            if self.min_length_m is not None and length < self.min_length_m:
+                return False
+            if self.max_length_m is not None and length > self.max_length_m:
+                return False
+        return True
+
+def normalize_report(report: Dict, fields: Sequence[str] = SUMMARY_FIELDS) -> Dict:
+    return {
+        field: (report.get(field) or '').upper() if field in UPPERCASE_FIELDS else report.get(field)
+        for field in fields
+    }
+
+def iter_normalized(reports: Iterable[Dict], fields: Sequence[str] = SUMMARY_FIELDS,
+                    filters: Optional[ReportFilter] = None, limit: int = 0) -> Iterator[Dict]:
+    """Filter and project reports in a single pass, stopping at limit."""
+    filters = filters or ReportFilter()
+    count = 0
+    for report in reports:
+        if not filters.matches(report):
+            continue
+        yield normalize_report(report, fields)
+        count += 1
+        if limit and limit > 0 and count >= limit:
+            return
+
+def normalize_reports(reports: Iterable[Dict], fields: Sequence[str] = SUMMARY_FIELDS,
+                      filters: Optional[ReportFilter] = None, limit: int = 0) -> List[Dict]:
+    return list(iter_normalized(reports, fields, filters, limit))
+
+def summary_fields_with(fields: Sequence[str]) -> Sequence[str]:
+    """SUMMARY_FIELDS plus any other requested fields, for rows projected later."""
+    return SUMMARY_FIELDS + tuple(f for f in fields if f not in SUMMARY_FIELDS)
+
+def project_vessels(vessels: List[Dict], fields: Sequence[str]) -> List[Dict]:
+    """Narrow normalized vessels to fields, returning the same list if nothing changes."""
+    fields = tuple(fields)
+    if not vessels or tuple(vessels[0]) == fields:
+        return vessels
+    return [{field: vessel.get(field) for field in fields} for vessel in vessels]
+
+def iter_json_array(chunks, key='reports'):
+    """Yield the elements of the top-level array under key as text chunks arrive.
+
+    Only one element plus the unread tail of the current chunk is held at a
+    time, so memory stays flat no matter how large the document is.
+    """
+    decoder = json.JSONDecoder()
+    marker = f'"{key}"'
+    buf = ''
+    in_array = False
+    for chunk in chunks:
+        buf += chunk
+        if not in_array:
+            start = buf.find(marker)
+            if start < 0:
+                buf = buf[-len(marker):]
+                continue
+            bracket = buf.find('[', start + len(marker))
+            if bracket < 0:
+                buf = buf[start:]
+                continue
+            buf = buf[bracket + 1:]
+            in_array = True
+
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buf):
+                break
+            if buf[pos] == ']':
+                return
+            try:
+                item, pos_end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # element continues in the next chunk
+            yield item
+            pos = pos_end
+        buf = buf[pos:]
+
+    if in_array and buf.strip():
+        raise ValueError(f"Truncated '{key}' array in AIS response")
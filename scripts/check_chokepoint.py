@@ -1,6 +1,9 @@
+import logging
 import geopandas as gpd
 from shapely.geometry import LineString
 
+logger = logging.getLogger(__name__)
+
 # Load chokepoints once
 _chokepoints_gdf = None
 
@@ -15,19 +18,19 @@ def load_chokepoints():
 
 def get_chokepoints_on_route(route_coords):
     if not route_coords or len(route_coords) < 2:
-        print("No route coordinates provided")
+        logger.warning("No route coordinates provided")
         return []
     
-    print(f"Checking {len(route_coords)} route points for chokepoints")
-    print(f"First point: {route_coords[0]}")
-    print(f"Last point: {route_coords[-1]}")
+    logger.debug("Checking %s route points for chokepoints", len(route_coords))
+    logger.debug("First point: %s", route_coords[0])
+    logger.debug("Last point: %s", route_coords[-1])
     
     chokepoints = load_chokepoints()
-    print(f"Loaded {len(chokepoints)} chokepoint polygons")
+    logger.debug("Loaded %s chokepoint polygons", len(chokepoints))
 
     # shapely expects lon, lat
     route_line = LineString([(lon, lat) for lat, lon in route_coords])
-    print(f"Route line created: {route_line.bounds}")
+    logger.debug("Route line created: %s", route_line.bounds)
 
     hits = []
     for idx, row in chokepoints.iterrows():
@@ -36,7 +39,7 @@ def get_chokepoints_on_route(route_coords):
         if route_line.intersects(buffered_polygon):
             c = row.geometry.centroid
             chokepoint_name = row.get("name", "Unknown")
-            print(f"HIT: {chokepoint_name}")
+            logger.debug("HIT: %s", chokepoint_name)
             hits.append({
                 "name": chokepoint_name,
                 "lat": c.y,
@@ -46,7 +49,7 @@ def get_chokepoints_on_route(route_coords):
             # Check distance to see how close we are
             distance = route_line.distance(row.geometry)
             if distance < 1.0:  # If within 1 degree (~111km), log it
-                print(f"Near miss: {row.get('name', 'Unknown')} - distance: {distance:.4f} degrees (~{distance*111:.1f}km)")
+                logger.debug("Near miss: %s - distance: %.4f degrees (~%.1fkm)", row.get('name', 'Unknown'), distance, distance*111)
 
-    print(f"Found {len(hits)} chokepoints on route")
+    logger.info("Found %s chokepoints on route", len(hits))
     return hits
\ No newline at end of file
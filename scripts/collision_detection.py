@@ -1,8 +1,9 @@
 import numpy as np
 from math import radians, sin, cos, sqrt
 from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
+from dead_reckoning import project_positions
 
 @dataclass
 class Vessel:
@@ -14,6 +15,7 @@ class Vessel:
     bearing_deg: float
     length_meters: Optional[float] = None
     width_meters: Optional[float] = None
+    time_sec_utc: Optional[float] = None
 
 @dataclass
 class CollisionRisk:
@@ -23,6 +25,48 @@ class CollisionRisk:
     tcpa_minutes: float
     risk_level: str
 
+def vessels_from_reports(reports: List[Dict]) -> List[Vessel]:
+    """Moving vessels from AIS report/summary dicts, skipping incomplete ones."""
+    return [
+        Vessel(
+            mmsi=r.get('mmsi', 'Unknown'),
+            name=r.get('boatName', 'Unknown'),
+            lat=r['point']['latitude'],
+            lon=r['point']['longitude'],
+            speed_kmh=r['speedKmh'],
+            bearing_deg=r['bearingDeg'],
+            length_meters=r.get('lengthMeters'),
+            width_meters=r.get('widthMeters'),
+            time_sec_utc=r.get('timeSecUtc')
+        )
+        for r in reports
+        if r.get('speedKmh') and r.get('bearingDeg') is not None
+        and r.get('point') and r['point'].get('latitude') and r['point'].get('longitude')
+    ]
+
+def collision_to_dict(collision: CollisionRisk) -> Dict:
+    return {
+        'vessel_a': {
+            'mmsi': collision.vessel_a.mmsi,
+            'name': collision.vessel_a.name,
+            'lat': collision.vessel_a.lat,
+            'lon': collision.vessel_a.lon,
+            'speed_kmh': collision.vessel_a.speed_kmh,
+            'bearing_deg': collision.vessel_a.bearing_deg
+        },
+        'vessel_b': {
+            'mmsi': collision.vessel_b.mmsi,
+            'name': collision.vessel_b.name,
+            'lat': collision.vessel_b.lat,
+            'lon': collision.vessel_b.lon,
+            'speed_kmh': collision.vessel_b.speed_kmh,
+            'bearing_deg': collision.vessel_b.bearing_deg
+        },
+        'cpa_km': round(collision.cpa_km, 3),
+        'tcpa_minutes': round(collision.tcpa_minutes, 1),
+        'risk_level': collision.risk_level
+    }
+
 class CollisionDetector:
     def __init__(self):
         self.cpa_warning_km = 1.852
@@ -80,30 +124,37 @@ class CollisionDetector:
         else:
             return "LOW"
 
-    def detect_collisions(self, vessels: List[Vessel]) -> List[CollisionRisk]:
+    def detect_collisions(self, vessels: List[Vessel], ref_time: Optional[float] = None) -> List[CollisionRisk]:
         n = len(vessels)
         if n < 2:
             return []
 
-        east = np.zeros(n)
-        north = np.zeros(n)
-        lat0 = np.mean([v.lat for v in vessels])
-        lon0 = np.mean([v.lon for v in vessels])
-        lat0r = radians(lat0)
-
-        for i, v in enumerate(vessels):
-            latr = radians(v.lat)
-            lonr = radians(v.lon)
-            east[i] = self.R * (lonr - radians(lon0)) * cos(lat0r)
-            north[i] = self.R * (latr - radians(lat0))
-
-        vx = np.zeros(n)
-        vy = np.zeros(n)
-        for i, v in enumerate(vessels):
-            speed = v.speed_kmh * 1000 / 3600
-            brg = radians(v.bearing_deg)
-            vx[i] = speed * sin(brg)
-            vy[i] = speed * cos(brg)
+        speeds = np.array([v.speed_kmh for v in vessels], dtype=float)
+        bearings = np.array([v.bearing_deg for v in vessels], dtype=float)
+        times = np.array([np.nan if v.time_sec_utc is None else v.time_sec_utc for v in vessels], dtype=float)
+
+        # Reports can be up to SHIP_MAX_AGE apart, so bring every vessel to the
+        # same instant before comparing tracks
+        if ref_time is None and not np.all(np.isnan(times)):
+            ref_time = float(np.nanmax(times))
+        lats = np.array([v.lat for v in vessels], dtype=float)
+        lons = np.array([v.lon for v in vessels], dtype=float)
+        if ref_time is not None:
+            lats, lons = project_positions(lats, lons, speeds, bearings, times, ref_time=ref_time)
+            vessels = [
+                replace(v, lat=float(lat), lon=float(lon), time_sec_utc=ref_time)
+                for v, lat, lon in zip(vessels, lats, lons)
+            ]
+
+        lat0r = radians(np.mean(lats))
+        lon0r = radians(np.mean(lons))
+        east = self.R * (np.radians(lons) - lon0r) * cos(lat0r)
+        north = self.R * (np.radians(lats) - lat0r)
+
+        speed_ms = speeds * 1000 / 3600
+        brg = np.radians(bearings)
+        vx = speed_ms * np.sin(brg)
+        vy = speed_ms * np.cos(brg)
 
         idx_i, idx_j = np.triu_indices(n, 1)
         rx = east[idx_j] - east[idx_i]
@@ -162,7 +213,8 @@ class CollisionDetector:
                         speed_kmh=speed,
                         bearing_deg=ship.get('bearingDeg', 0),
                         length_meters=ship.get('lengthMeters'),
-                        width_meters=ship.get('widthMeters')
+                        width_meters=ship.get('widthMeters'),
+                        time_sec_utc=ship.get('timeSecUtc')
                     ))        
         return self.detect_collisions(vessels)
 
@@ -4,9 +4,33 @@ import os
 class Config:
     # GDACS RSS feed URL
     GDACS_RSS_URL = "https://www.gdacs.org/xml/rss.xml"
+    GDACS_CACHE_TTL_SEC = 300  # Reuse the parsed feed for this long
     
     # Port data file
     PORT_DATA_FILE = 'port_details.csv'
+    PORT_SEARCH_MAX_RESULTS = 25  # Cap on /api/port_search results
+    NEAREST_PORTS_MAX_RESULTS = 50  # Cap on /api/nearest_ports results
+    PORT_CALL_RADIUS_KM = 10  # A vessel this close to a port is treated as at that port
+    
+    # Geocoding (Nominatim behind a persistent cache and one background worker per process)
+    GEOCODE_CACHE_PATH = 'Data/geocode_cache.sqlite3'
+    GEOCODE_FOUND_TTL_SEC = 30 * 86400
+    GEOCODE_NOT_FOUND_TTL_SEC = 86400
+    GEOCODE_WAIT_SEC = 0  # Requests never wait on Nominatim; the page asks again while an origin is pending
+    GEOCODE_QUEUE_MAX = 1000
+    NOMINATIM_RATE_PER_SEC = 1.0  # Nominatim usage policy: at most one request per second
+    NOMINATIM_BURST = 1
+    NOMINATIM_TIMEOUT_SEC = 20
+    NOMINATIM_MAX_RETRIES = 3
+    
+    # VesselFinder origin lookups (one long-lived client per process)
+    VESSELFINDER_TIMEOUT_SEC = 5
+    VESSELFINDER_MAX_CONNECTIONS = 8
+    VESSELFINDER_CACHE_MAX_ENTRIES = 10000
+    VESSELFINDER_ORIGIN_TTL_SEC = 6 * 3600  # Origins only change when a vessel leaves port
+    VESSELFINDER_NO_ORIGIN_TTL_SEC = 1800
+    VESSELFINDER_BATCH_TIMEOUT_SEC = 15
+    VESSELFINDER_BATCH_MAX = 100  # Cap on MMSIs per /api/vessel_origins request
     
     # Default map settings
     DEFAULT_MAP_LOCATION = [20, 0]
@@ -22,6 +46,41 @@ class Config:
     # Ship tracking settings
     SHIP_MAX_AGE = 1800  # 30 minutes in seconds
     SHIP_RADIUS_FALLBACK_KM = 50  # Fallback radius when no ships found in bbox
+    DEAD_RECKONING_MAX_GAP_SEC = 1800  # Never extrapolate a position further than this
+    AIS_STREAM_CHUNK_BYTES = 65536  # Read size when streaming large MarinePlan responses
+    AIS_STREAM_BATCH_SIZE = 500  # Streamed reports buffered before they reach the table and track store
+
+    # Background AIS ingestion (serves vessel endpoints from memory when enabled)
+    AIS_INGEST_ENABLED = os.getenv('AIS_INGEST_ENABLED', '0') == '1'
+    AIS_INGEST_REGIONS_FILE = 'Data/ocean_regions.csv'
+    AIS_INGEST_INTERVAL_SEC = 120
+    AIS_INGEST_MAX_STALENESS_SEC = 300  # Fall back to MarinePlan if a region is older than this
+    AIS_INGEST_INCLUDE_STATIONARY = True
+    VESSEL_GRID_CELL_DEG = 1.0  # Cell size of the live vessel spatial index
+    VESSEL_DELTA_HISTORY = 120  # Snapshot diffs kept for since=<version> requests
+    VESSEL_REBUILD_MIN_INTERVAL_SEC = 10  # Request-path upstream fetches rebuild the table at most this often
+    CLUSTER_BASE_CELL_DEG = 90.0  # Cluster cell size at zoom 0, halved at every zoom level
+    CLUSTER_MAX_ZOOM = 8  # Above this zoom the cluster endpoint returns individual vessels
+    DESTINATION_CACHE_MAX_ENTRIES = 50000  # Resolved AIS destination strings kept across snapshots
+
+    # Per-vessel track history (memory-mapped ring buffers, single writer process)
+    TRACK_STORE_PATH = 'Data/vessel_tracks.dat'
+    TRACK_STORE_MAX_VESSELS = 20000
+    TRACK_STORE_POINTS_PER_VESSEL = 128
+    TRACK_STORE_FLUSH_SEC = 30
+    TRAIL_DEFAULT_HOURS = 6
+
+    # Live vessel delta stream (SSE)
+    VESSEL_STREAM_INTERVAL_SEC = 15
+    VESSEL_STREAM_MAX_SEC = 1800  # Clients reconnect after this to free the worker
+
+    # Server-side vessel snapshots referenced by follow-up requests
+    SNAPSHOT_TTL_SEC = 300
+    SNAPSHOT_MAX_ENTRIES = 500
+
+    # Encoded responses of slow-changing endpoints (ETag + precompressed variants)
+    RESPONSE_CACHE_MAX_ENTRIES = 256
+    RESPONSE_COMPRESS_MIN_BYTES = 1024
 
     # Port congestion settings
     PORT_CONGESTION_RADIUS_KM = 5
@@ -35,6 +94,25 @@ class Config:
     ECA_MPA_HIGHLIGHT_COLOR = '#FFFF00'  # Yellow
     ECA_MPA_HIGHLIGHT_OPACITY = 0.3
     
+    # Admin-only per-request profiling (X-Profile: 1 plus X-Admin-Token)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+    PROFILE_DIR = 'Data/profiles'
+    PROFILE_SAMPLE_INTERVAL_SEC = 0.005
+    PROFILE_TRACEMALLOC_FRAMES = 10
+    PROFILE_TOP_ALLOCATIONS = 25
+    
+    # Logging (see log_setup.configure_logging)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    # Per-module overrides, e.g. LOG_MODULE_LEVELS="vessel_details=DEBUG,ships=WARNING"
+    LOG_MODULE_LEVELS = {'urllib3': 'WARNING', 'werkzeug': 'INFO'}
+    LOG_MODULE_LEVELS.update(
+        (name.strip(), level.strip().upper())
+        for name, level in (item.split('=', 1) for item in os.getenv('LOG_MODULE_LEVELS', '').split(',') if '=' in item)
+    )
+    LOG_RATE_LIMIT_PER_WINDOW = 20  # Records per message template per window (WARNING and below)
+    LOG_RATE_LIMIT_WINDOW_SEC = 60
+    
     # Server configuration
     DEBUG = True
     HOST = '127.0.0.1'
@@ -0,0 +1,40 @@
+import time
+import numpy as np
+from typing import Optional, Tuple
+from config import Config
+
+EARTH_RADIUS_M = 6371000.0
+
+def project_positions(lats, lons, speeds_kmh, bearings_deg, times_sec,
+                      ref_time: Optional[float] = None,
+                      max_gap_sec: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Dead-reckon every position forward (or back) to a common reference time.
+
+    Uses a local flat-earth step, which is accurate to metres over the
+    half-hour gaps AIS snapshots contain. Vessels with no timestamp, speed
+    or bearing are left where they were reported.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    speeds = np.nan_to_num(np.asarray(speeds_kmh, dtype=np.float64), nan=0.0)
+    bearings = np.nan_to_num(np.asarray(bearings_deg, dtype=np.float64), nan=0.0)
+    times = np.asarray(times_sec, dtype=np.float64)
+
+    if ref_time is None:
+        ref_time = time.time()
+    if max_gap_sec is None:
+        max_gap_sec = Config.DEAD_RECKONING_MAX_GAP_SEC
+
+    dt = np.where(np.isnan(times), 0.0, ref_time - times)
+    dt = np.clip(dt, -max_gap_sec, max_gap_sec)
+
+    distance_m = speeds * (1000.0 / 3600.0) * dt
+    brg = np.radians(bearings)
+    cos_lat = np.maximum(np.cos(np.radians(lats)), 1e-6)
+
+    new_lats = lats + np.degrees(distance_m * np.cos(brg) / EARTH_RADIUS_M)
+    new_lons = lons + np.degrees(distance_m * np.sin(brg) / (EARTH_RADIUS_M * cos_lat))
+
+    new_lats = np.clip(new_lats, -90.0, 90.0)
+    new_lons = (new_lons + 180.0) % 360.0 - 180.0
+    return new_lats, new_lons
@@ -0,0 +1,65 @@
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from port_index import normalize_port_code, port_index
+from port_resolver import port_resolver
+
+class DestinationCache:
+    """Candidate port codes for each AIS destination string, shared across snapshots.
+
+    Most vessels keep their destination from one snapshot to the next, so
+    after the first pass only new strings go through the resolver.
+    """
+
+    def __init__(self, resolver=port_resolver, max_entries=None):
+        self.resolver = resolver
+        self.max_entries = max_entries or Config.DESTINATION_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._codes: Dict[str, Tuple[str, ...]] = {}
+
+    def port_codes(self, destination: str) -> Tuple[str, ...]:
+        try:
+            return self._codes[destination]
+        except KeyError:
+            pass
+        codes = tuple(dict.fromkeys(
+            normalize_port_code(port.port_code) for port in self.resolver.destination_candidates(destination)
+        ))
+        with self._lock:
+            if len(self._codes) >= self.max_entries:
+                self._codes.clear()
+            self._codes[destination] = codes
+        return codes
+
+class DestinationIndex:
+    """Inbound vessels per port for one snapshot.
+
+    Every vessel's destination is resolved when the index is built, so
+    expected arrivals for any port is a dict lookup. A destination that
+    several ports share ("VICTORIA") lists the vessel under each of them;
+    callers narrow by distance from the port.
+    """
+
+    def __init__(self, snapshot, cache: Optional[DestinationCache] = None):
+        cache = cache or destination_cache
+        rows_by_port: Dict[str, List[int]] = {}
+        for row, record in enumerate(snapshot.records):
+            if not record.destination_name:
+                continue
+            for code in cache.port_codes(record.destination_name):
+                rows_by_port.setdefault(code, []).append(row)
+        self._rows = {code: np.array(rows, dtype=np.int64) for code, rows in rows_by_port.items()}
+        self._mmsi = snapshot.mmsi
+
+    def rows_for(self, port_code) -> np.ndarray:
+        # Accept any spelling the port index knows, e.g. MACAS for MA CAS
+        port = port_index.get(port_code)
+        key = normalize_port_code(port.port_code if port else port_code)
+        return self._rows.get(key, np.empty(0, dtype=np.int64))
+
+    def mmsis_for(self, port_code) -> List[int]:
+        return self._mmsi[self.rows_for(port_code)].tolist()
+
+# Global instance
+destination_cache = DestinationCache()
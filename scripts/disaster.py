@@ -1,8 +1,15 @@
+import logging
+import hashlib
+import threading
+import time
 import requests
 import xml.etree.ElementTree as ET
 from math import radians, sin, cos, sqrt, atan2
 from config import Config
 from ships import get_ships_for_disasters
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 # Namespace handling for XML parsing
 namespaces = {
@@ -43,10 +50,16 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     
     return R * c
 
-def parse_gdacs_rss():
+# Last parsed GDACS feed, shared by every endpoint until it expires
+_feed_lock = threading.Lock()
+_feed = {'events': None, 'version': None, 'fetched_at': 0.0}
+
+def _fetch_gdacs_events():
     try:
-        response = requests.get(Config.GDACS_RSS_URL, timeout=10)
-        response.raise_for_status()
+        with metrics.upstream('gdacs'):
+            response = requests.get(Config.GDACS_RSS_URL, timeout=10)
+            response.raise_for_status()
+        version = hashlib.sha1(response.content).hexdigest()[:16]
         
         root = ET.fromstring(response.content)
         events = []
@@ -139,11 +152,31 @@ def parse_gdacs_rss():
                 'is_current': is_current
             })
         
-        return events
+        return events, version
         
     except Exception as e:
-        print(f"Error parsing RSS: {e}")
-        return []
+        logger.error("Error parsing RSS: %s", e)
+        return None, None
+
+def parse_gdacs_rss():
+    """Current GDACS events, refetched at most every GDACS_CACHE_TTL_SEC.
+
+    Callers get their own copies of the event dicts since some annotate
+    them (e.g. distance_km). A failed refresh keeps serving the last feed.
+    """
+    with _feed_lock:
+        fresh = _feed['events'] is not None and time.time() - _feed['fetched_at'] <= Config.GDACS_CACHE_TTL_SEC
+        metrics.cache_lookup('gdacs_feed', fresh)
+        if not fresh:
+            events, version = _fetch_gdacs_events()
+            if events is not None:
+                _feed.update(events=events, version=version, fetched_at=time.time())
+        events = _feed['events'] or []
+    return [dict(event) for event in events]
+
+def gdacs_feed_version():
+    """Content hash of the feed parse_gdacs_rss last served."""
+    return _feed['version'] or 'none'
     
 def filter_current_events(events):
     return [event for event in events if event.get('is_current', False)]
@@ -1,3 +1,4 @@
+import logging
 import geopandas as gpd
 import pandas as pd
 from shapely.geometry import LineString
@@ -5,6 +6,8 @@ from shapely.strtree import STRtree
 import pickle
 import os
 
+logger = logging.getLogger(__name__)
+
 class FastECAMPA:
     def __init__(self):
         self.data_file = "Data/eca_mpa_data.pkl"
@@ -21,16 +24,16 @@ class FastECAMPA:
         if os.path.exists(self.data_file):
             try:
                 self._load_data()
-                print("Loaded ECA/MPA data + STRtree index")
+                logger.info("Loaded ECA/MPA data + STRtree index")
                 self.loaded = True
                 return
             except Exception as e:
-                print(f"Failed loading saved data; rebuilding. Reason: {e}")
+                logger.warning("Failed loading saved data; rebuilding. Reason: %s", e)
 
         self._build_data()
 
     def _build_data(self):
-        print("Building ECA/MPA STRtree index...")
+        logger.info("Building ECA/MPA STRtree index...")
 
         # Load shapefiles
         eca_gdf = gpd.read_file("Data/eca_reg14_sox_pm.zip")
@@ -64,7 +67,7 @@ class FastECAMPA:
             pickle.dump(self.features, f)
 
         self.loaded = True
-        print(f"STRtree built with {len(self.features)} features")
+        logger.info("STRtree built with %s features", len(self.features))
 
     def _load_data(self):
         with open(self.data_file, "rb") as f:
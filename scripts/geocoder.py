@@ -0,0 +1,182 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import requests
+from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+from config import Config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Result statuses returned by Geocoder.lookup
+FOUND = 'found'
+NOT_FOUND = 'not_found'
+PENDING = 'pending'
+
+class GeocodeCache:
+    """SQLite store of geocoding answers, found or not, each with an expiry.
+
+    WAL mode lets every worker process read and write the same file.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS geocodes ('
+                'query TEXT PRIMARY KEY, lat REAL, lon REAL, expires_at REAL NOT NULL)'
+            )
+
+    def get(self, query: str) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        """(lat, lon) for a cached answer, (None, None) for a cached miss, None if unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT lat, lon FROM geocodes WHERE query = ? AND expires_at > ?', (query, time.time())
+            ).fetchone()
+        metrics.cache_lookup('geocode', row is not None)
+        return row
+
+    def put(self, query: str, lat: Optional[float], lon: Optional[float]):
+        ttl = Config.GEOCODE_FOUND_TTL_SEC if lat is not None else Config.GEOCODE_NOT_FOUND_TTL_SEC
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO geocodes (query, lat, lon, expires_at) VALUES (?, ?, ?, ?)',
+                (query, lat, lon, time.time() + ttl)
+            )
+
+class TokenBucket:
+    """Blocking rate limiter; only the geocoding worker ever waits on it."""
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class Geocoder:
+    """Nominatim geocoding behind a persistent cache and one background worker.
+
+    Request threads never call Nominatim. A lookup answers from the cache,
+    or queues the name for the worker and returns PENDING, waiting for it
+    only if given a wait_sec (GEOCODE_WAIT_SEC, 0 by default).
+    The worker shares one client and one token bucket, so the whole
+    process stays inside Nominatim's rate limit however many requests ask.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path or Config.GEOCODE_CACHE_PATH
+        self._cache = None
+        self._bucket = TokenBucket(Config.NOMINATIM_RATE_PER_SEC, Config.NOMINATIM_BURST)
+        self._queue = queue.Queue(maxsize=Config.GEOCODE_QUEUE_MAX)
+        self._pending: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def cache(self) -> GeocodeCache:
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    self._cache = GeocodeCache(self.cache_path)
+        return self._cache
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='geocoder', daemon=True)
+            self._thread.start()
+
+    def lookup(self, name: str, wait_sec: Optional[float] = None) -> Tuple[str, Optional[float], Optional[float]]:
+        """(status, lat, lon) for name; status is FOUND, NOT_FOUND or PENDING."""
+        key = ' '.join(name.split()).lower()
+        cached = self.cache.get(key)
+        if cached is not None:
+            lat, lon = cached
+            return (FOUND if lat is not None else NOT_FOUND), lat, lon
+
+        with self._lock:
+            done = self._pending.get(key)
+            if done is None:
+                done = threading.Event()
+                try:
+                    self._queue.put_nowait((key, name))
+                except queue.Full:
+                    logger.warning("Geocoding queue full, dropping %s", name)
+                    return PENDING, None, None
+                self._pending[key] = done
+        self.start()
+
+        wait_sec = Config.GEOCODE_WAIT_SEC if wait_sec is None else wait_sec
+        if wait_sec > 0 and done.wait(wait_sec):
+            cached = self.cache.get(key)
+            if cached is not None:
+                lat, lon = cached
+                return (FOUND if lat is not None else NOT_FOUND), lat, lon
+        return PENDING, None, None
+
+    def _geocode(self, client, name: str) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        """(lat, lon), (None, None) if Nominatim knows no such place, None if it kept failing."""
+        failed = False
+        # Try with "Port" appended first
+        for query in (f"{name} Port", name):
+            for attempt in range(Config.NOMINATIM_MAX_RETRIES):
+                self._bucket.acquire()
+                try:
+                    with metrics.upstream('nominatim'):
+                        location = client.geocode(query, addressdetails=True)
+                except (GeocoderTimedOut, GeocoderServiceError, requests.exceptions.ReadTimeout) as e:
+                    logger.debug("Nominatim attempt %s for %s failed: %s", attempt + 1, query, e)
+                    continue
+                if location:
+                    return location.latitude, location.longitude
+                break
+            else:
+                failed = True
+        return None if failed else (None, None)
+
+    def _run(self):
+        client = Nominatim(user_agent="research_app", timeout=Config.NOMINATIM_TIMEOUT_SEC)
+        while True:
+            key, name = self._queue.get()
+            try:
+                result = self._geocode(client, name)
+                if result is None:
+                    # Not cached, so the next lookup tries again
+                    logger.warning("Nominatim unavailable for %s", name)
+                else:
+                    self.cache.put(key, *result)
+                    logger.info("Geocoded %s", name, extra={'found': result[0] is not None})
+            except Exception as e:
+                logger.error("Error geocoding %s: %s", name, e)
+            finally:
+                with self._lock:
+                    done = self._pending.pop(key, None)
+                if done is not None:
+                    done.set()
+
+# Global instance
+geocoder = Geocoder()
@@ -0,0 +1,55 @@
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    orjson encodes NumPy scalars/arrays and datetimes (as ISO 8601) natively.
+    Without orjson installed, or for values it rejects (e.g. ints beyond
+    64 bits), encoding falls back to Flask's default provider.
+    """
+
+    @staticmethod
+    def _default(o):
+        if isinstance(o, np.generic):
+            return o.item()
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+
+    def _options(self, indent: bool) -> int:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _encode(self, obj, indent: bool = False):
+        """orjson bytes for obj, or None if the fallback encoder must be used."""
+        if orjson is None:
+            return None
+        try:
+            return orjson.dumps(obj, default=self._default, option=self._options(indent))
+        except TypeError:
+            return None
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Explicit json.dumps options are only understood by the stdlib encoder
+            return super().dumps(obj, **kwargs)
+        encoded = self._encode(obj)
+        return encoded.decode('utf-8') if encoded is not None else super().dumps(obj)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        encoded = self._encode(obj, indent=pretty)
+        if encoded is None:
+            return super().response(obj)
+        return self._app.response_class(encoded + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,106 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+from config import Config
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+_listener = None
+
+class StructuredFormatter(logging.Formatter):
+    """logfmt lines: time, level, logger and message, then any extra= fields."""
+
+    @staticmethod
+    def _quote(value) -> str:
+        text = str(value)
+        if not text or any(c in text for c in ' ="\n'):
+            text = '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        return text
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            f"time={self.formatTime(record, '%Y-%m-%dT%H:%M:%S')}",
+            f"level={record.levelname}",
+            f"logger={record.name}",
+            f"msg={self._quote(record.getMessage())}"
+        ]
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                parts.append(f"{key}={self._quote(value)}")
+        line = ' '.join(parts)
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+class RateLimitFilter(logging.Filter):
+    """Pass at most max_per_window records per message template per window.
+
+    Only records at or below max_level are limited, so warnings about a
+    single vessel in a loop are capped but errors always get through. The
+    first record let through after a suppression carries the count.
+    """
+
+    def __init__(self, max_per_window: int, window_sec: float, max_level: int):
+        super().__init__()
+        self.max_per_window = max_per_window
+        self.window_sec = window_sec
+        self.max_level = max_level
+        self._lock = threading.Lock()
+        self._windows: Dict[tuple, list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_sec:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.max_per_window:
+                window[2] += 1
+                return False
+            window[1] += 1
+        return True
+
+def configure_logging(level: Optional[str] = None, module_levels: Optional[Dict[str, str]] = None,
+                      log_file: Optional[str] = None):
+    """Route every logger through one queue so callers never block on I/O.
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener
+    root = logging.getLogger()
+    levels = dict(Config.LOG_MODULE_LEVELS)
+    levels.update(module_levels or {})
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
+    if _listener is not None:
+        return
+
+    # Records are formatted before they are queued; the writer thread only does I/O
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(StructuredFormatter())
+    queue_handler.addFilter(RateLimitFilter(
+        Config.LOG_RATE_LIMIT_PER_WINDOW, Config.LOG_RATE_LIMIT_WINDOW_SEC, logging.WARNING
+    ))
+    root.handlers = [queue_handler]
+    root.setLevel(level or Config.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
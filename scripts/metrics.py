@@ -0,0 +1,200 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# Latency buckets in seconds, from cache hits up to slow upstream calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+# Upstream calls made on behalf of the current request, by service
+_request_calls: ContextVar[Optional[Dict[str, int]]] = ContextVar('request_upstream_calls', default=None)
+
+def _label_str(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} {self.kind}'
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield from self._render_value(key, value)
+
+    def _render_value(self, key, value):
+        yield f'{self.name}{_label_str(self.labels, key)} {value}'
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key, value):
+        counts, total, n = value
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            yield f'{self.name}_bucket{_label_str(self.labels + ("le",), key + (le,))} {cumulative}'
+        yield f'{self.name}_sum{_label_str(self.labels, key)} {total}'
+        yield f'{self.name}_count{_label_str(self.labels, key)} {n}'
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text format.
+
+    Values are per worker process; scrape every worker (or run one) to see
+    the whole picture.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._executors: Dict[str, weakref.WeakSet] = {}
+
+        self.http_latency = self.histogram(
+            'http_request_duration_seconds', 'Time to produce a response', ('endpoint', 'method', 'status'))
+        self.upstream_calls = self.counter(
+            'upstream_requests_total', 'Calls to external services', ('service', 'outcome'))
+        self.upstream_latency = self.histogram(
+            'upstream_request_duration_seconds', 'Latency of calls to external services', ('service',))
+        self.calls_per_request = self.histogram(
+            'upstream_calls_per_request', 'External calls made while serving one request',
+            ('endpoint', 'service'), buckets=COUNT_BUCKETS)
+        self.cache_requests = self.counter(
+            'cache_requests_total', 'Cache lookups by result', ('cache', 'result'))
+        self.cache_hit_ratio = self.gauge(
+            'cache_hit_ratio', 'Hits over lookups since start', ('cache',))
+        self.executor_queue = self.gauge(
+            'executor_queue_depth', 'Tasks waiting for a worker thread', ('pool',))
+        self.executor_live = self.gauge(
+            'executor_pools_active', 'Live thread pools', ('pool',))
+
+    def counter(self, name, help_text, labels=()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, labels=()) -> Gauge:
+        metric = Gauge(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    @contextmanager
+    def upstream(self, service: str):
+        """Time one call to an external service and count it against the current request."""
+        calls = _request_calls.get()
+        if calls is not None:
+            calls[service] = calls.get(service, 0) + 1
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            self.upstream_latency.observe(time.perf_counter() - started, service=service)
+            self.upstream_calls.inc(service=service, outcome=outcome)
+
+    def cache_lookup(self, cache: str, hit: bool):
+        self.cache_requests.inc(cache=cache, result='hit' if hit else 'miss')
+
+    def track_executor(self, pool: str, executor):
+        self._executors.setdefault(pool, weakref.WeakSet()).add(executor)
+        return executor
+
+    def start_request(self):
+        """Begin counting upstream calls for the request running in this context."""
+        return _request_calls.set({})
+
+    def request_calls(self) -> Optional[Dict[str, int]]:
+        """Upstream call counts of the current request, updated in place as calls happen."""
+        return _request_calls.get()
+
+    def finish_request(self, token, endpoint: str, method: str, status: int, duration_sec: float,
+                       calls: Optional[Dict[str, int]] = None):
+        if calls is None:
+            calls = _request_calls.get() or {}
+        try:
+            _request_calls.reset(token)
+        except ValueError:
+            # Finished from another context, e.g. once a streamed body closed
+            pass
+        self.http_latency.observe(duration_sec, endpoint=endpoint, method=method, status=status)
+        for service, count in calls.items():
+            self.calls_per_request.observe(count, endpoint=endpoint, service=service)
+        if 'marineplan' not in calls:
+            self.calls_per_request.observe(0, endpoint=endpoint, service='marineplan')
+
+    def _refresh_derived(self):
+        caches = {key[0] for key in list(self.cache_requests._values)}
+        for cache in caches:
+            hits = self.cache_requests.value(cache=cache, result='hit')
+            total = hits + self.cache_requests.value(cache=cache, result='miss')
+            self.cache_hit_ratio.set(round(hits / total, 4) if total else 0.0, cache=cache)
+        for pool, executors in list(self._executors.items()):
+            live = [e for e in list(executors) if not getattr(e, '_shutdown', False)]
+            self.executor_queue.set(sum(e._work_queue.qsize() for e in live), pool=pool)
+            self.executor_live.set(len(live), pool=pool)
+
+    def render(self) -> str:
+        self._refresh_derived()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+# Global instance
+metrics = MetricsRegistry()
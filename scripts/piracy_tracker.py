@@ -1,6 +1,10 @@
+import logging
 import requests
 from datetime import datetime, timedelta, timezone
 from geopy.distance import geodesic
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 class PiracyMonitor:
     def __init__(self):
@@ -10,7 +14,8 @@ class PiracyMonitor:
     
     def load_incidents(self):
         try:
-            data = requests.get(self.url, timeout=10).json()
+            with metrics.upstream('icc'):
+                data = requests.get(self.url, timeout=10).json()
             now = datetime.now(timezone.utc)
             cutoff = now - timedelta(days=150)
             
@@ -45,10 +50,10 @@ class PiracyMonitor:
                         }
                         self.piracy_incidents.append(incident)
             
-            print(f"Loaded {len(self.piracy_incidents)} piracy incidents from last 90 days")
+            logger.info("Loaded %s piracy incidents from last 90 days", len(self.piracy_incidents))
             
         except Exception as e:
-            print(f"Error loading piracy incidents: {e}")
+            logger.error("Error loading piracy incidents: %s", e)
             self.piracy_incidents = []
     
     def parse_coordinates(self, address):
@@ -1,7 +1,15 @@
-import requests
-from geopy.distance import geodesic
+import logging
+import concurrent.futures
+import contextvars
 from config import Config
+from ships import get_area_snapshot
+from metrics import metrics
+from port_resolver import clean_destination_name
+from spatial_index import haversine_km
 import math
+import time
+
+logger = logging.getLogger(__name__)
 
 def calculate_bbox_around_point(lat, lon, radius_km):
     earth_radius = 6371
@@ -16,40 +24,38 @@ def calculate_bbox_around_point(lat, lon, radius_km):
     
     return f"{min_lat},{min_lon};{max_lat},{max_lon}"
 
-def get_port_details_data(port_df, port_code, weather_func=None):
+def get_port_details_data(port_index, port_code, weather_func=None):
     try:
-        # Find port in the loaded dataframe
-        port = port_df[port_df['port_code'] == port_code]
+        port_data = port_index.row(port_code)
         
-        if port.empty:
+        if port_data is None:
             return {'error': 'Port not found'}
         
-        port_data = port.iloc[0].to_dict()
-        
         # Get coordinates
         port_lat = port_data['lat']
         port_lon = port_data['lon']
-        port_name = port_data.get('port_name', '')
-        alt_name = port_data.get('alt_name', '')
-        
-        # Get ships within 5km radius
-        ships_data = get_ships_near_port(port_lat, port_lon, radius_km=5, include_all_types=True)
         
-        # Get expected arrivals
-        expected_arrivals = get_expected_arrivals(
-            port_lat=port_lat,
-            port_lon=port_lon,
-            port_name=port_name,
-            port_code=port_code,
-            alt_name=alt_name,
-            radius_km=500, #control expected arrival radius here
-            api_key=Config.MARINEPLAN_API_KEY
-        )
+        arrivals_radius_km = 500  #control expected arrival radius here
+        bbox = calculate_bbox_around_point(port_lat, port_lon, arrivals_radius_km)
         
-        # Get weather forecast
-        weather_data = {}
-        if weather_func:
-            weather_data = weather_func(port_lat, port_lon) or {}
+        # One AIS fetch of the arrivals box (moving and stationary) covers the in-port
+        # ships too; weather is fetched alongside it
+        with metrics.track_executor('port_details', concurrent.futures.ThreadPoolExecutor(max_workers=2)) as executor:
+            future_snapshot = executor.submit(
+                contextvars.copy_context().run, get_area_snapshot, bbox, 0, Config.MARINEPLAN_API_KEY, 30
+            )
+            future_weather = executor.submit(contextvars.copy_context().run, weather_func, port_lat, port_lon) if weather_func else None
+            
+            try:
+                snapshot = future_snapshot.result()
+                ships_data = get_ships_near_port(snapshot, port_lat, port_lon, radius_km=5, include_all_types=True)
+                expected_arrivals = get_expected_arrivals(snapshot, port_lat, port_lon, port_code, radius_km=arrivals_radius_km)
+            except Exception as e:
+                logger.error("Error fetching ships around port: %s", e)
+                ships_data = {'ships': [], 'count': 0, 'error': str(e)}
+                expected_arrivals = {'ships': [], 'count': 0}
+            
+            weather_data = (future_weather.result() if future_weather else None) or {}
         
         # Prepare port details from CSV columns
         port_details = {
@@ -107,188 +113,65 @@ def get_port_details_data(port_df, port_code, weather_func=None):
         }
         
     except Exception as e:
-        print(f"Error getting port details: {e}")
+        logger.error("Error getting port details: %s", e)
         return {'error': str(e)}
 
-def get_ships_near_port(port_lat, port_lon, radius_km=5, include_all_types=False, api_key=None):
-    if not api_key:
-        api_key = Config.MARINEPLAN_API_KEY
+def get_ships_near_port(snapshot, port_lat, port_lon, radius_km=5, include_all_types=False):
+    rows = snapshot.query_radius(port_lat, port_lon, radius_km)
+    if not include_all_types:
+        rows = snapshot.filter_rows(rows, vessel_types=['CARGO_SHIP', 'TANKER'])
+    distances = haversine_km(port_lat, port_lon, snapshot.lat[rows], snapshot.lon[rows])
     
-    # Calculate bounding box around port
-    bbox = calculate_bbox_around_point(port_lat, port_lon, radius_km)
+    ships = []
+    for report, distance in zip(snapshot.to_reports(rows, ref_time=time.time()), distances):
+        speed = report.get('speedKmh') or 0
+        ships.append({
+            'boatName': report.get('boatName', '').upper(),
+            'mmsi': report.get('mmsi'),
+            'country': report.get('country'),
+            'vesselType': report.get('vesselType'),
+            'point': report.get('point', {}),
+            'destinationName': report.get('destinationName', '').upper(),
+            'speedKmh': report.get('speedKmh'),
+            'bearingDeg': report.get('bearingDeg'),
+            'draughtMeters': report.get('draughtMeters'),
+            'lengthMeters': report.get('lengthMeters'),
+            'widthMeters': report.get('widthMeters'),
+            'imo': report.get('imo'),
+            'distance_km': round(float(distance), 2),
+            'moving': speed > 0.5,
+            'status': 'Moving' if speed > 0.5 else 'Stationary'
+        })
     
-    url = "https://ais.marineplan.com/location/2/locations.json"
-    params = {
-        'area': bbox,
-        'moving': 0,  # include both moving and stationary
-        'maxage': 1800,
-        'source': 'AIS',
-        'key': api_key
+    return {
+        'ships': ships,
+        'count': len(ships),
+        'radius_km': radius_km,
+        'port_coordinates': {'lat': port_lat, 'lon': port_lon}
     }
-    
-    try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        ships = []
-        for report in data.get('reports', []):
-            point = report.get('point', {})
-            if point.get('latitude', 0) == 0.0 or point.get('longitude', 0) == 0.0:
-                continue
-            
-            # Calculate actual distance from port
-            distance = geodesic((port_lat, port_lon), 
-                               (point['latitude'], point['longitude'])).km
-            if distance <= radius_km:
-                # Check if we should include all types or filter
-                vessel_type = report.get('vesselType')
-                if not include_all_types and vessel_type not in ['CARGO_SHIP', 'TANKER']:
-                    continue
-                
-                ship_info = {
-                    'boatName': report.get('boatName', '').upper(),
-                    'mmsi': report.get('mmsi'),
-                    'country': report.get('country'),
-                    'vesselType': vessel_type,
-                    'point': point,
-                    'destinationName': report.get('destinationName', '').upper(),
-                    'speedKmh': report.get('speedKmh'),
-                    'bearingDeg': report.get('bearingDeg'),
-                    'draughtMeters': report.get('draughtMeters'),
-                    'lengthMeters': report.get('lengthMeters'),
-                    'widthMeters': report.get('widthMeters'),
-                    'imo': report.get('imo'),
-                    'distance_km': round(distance, 2),
-                    'moving': report.get('speedKmh', 0) > 0.5,
-                    'status': 'Moving' if report.get('speedKmh', 0) > 0.5 else 'Stationary'
-                }
-                ships.append(ship_info)
-        
-        return {
-            'ships': ships,
-            'count': len(ships),
-            'radius_km': radius_km,
-            'port_coordinates': {'lat': port_lat, 'lon': port_lon}
-        }
-        
-    except requests.RequestException as e:
-        print(f"Error fetching ships near port: {e}")
-        return {'ships': [], 'count': 0, 'error': str(e)}
-    except Exception as e:
-        print(f"Error processing ships near port: {e}")
-        return {'ships': [], 'count': 0, 'error': str(e)}
 
-def get_expected_arrivals(port_lat, port_lon, port_name, port_code, radius_km=500, api_key=None, alt_name=None):
-    if not api_key:
-        raise ValueError("API key is required")
-
-    url = "https://ais.marineplan.com/location/2/locations.json"
+def get_expected_arrivals(snapshot, port_lat, port_lon, port_code, radius_km=500):
+    # Destinations are resolved once per snapshot; this port's inbound vessels are a lookup
+    rows = snapshot.moving_rows(snapshot.destinations().rows_for(port_code))
+    distances = haversine_km(port_lat, port_lon, snapshot.lat[rows], snapshot.lon[rows])
+    rows = rows[distances <= radius_km]
     
-    bbox = calculate_bbox_around_point(port_lat, port_lon, radius_km)
+    expected_ships = []
+    for report in snapshot.to_reports(rows, ref_time=time.time()):
+        expected_ships.append({
+            "boatName": report.get("boatName", "").upper(),
+            "mmsi": report.get("mmsi"),
+            "vesselType": report.get("vesselType"),
+            "destinationName": clean_destination_name(report.get("destinationName")).upper(),
+            "point": report.get("point", {}),
+            "speedKmh": report.get("speedKmh"),
+            "bearingDeg": report.get("bearingDeg"),
+            "draughtMeters": report.get("draughtMeters"),
+            "lengthMeters": report.get("lengthMeters"),
+            "widthMeters": report.get("widthMeters"),
+            "imo": report.get("imo")
+        })
     
-    params = {
-        "area": bbox,
-        "moving": 1,
-        "maxage": 1800,
-        "source": "AIS",
-        "key": api_key
-    }
+    logger.debug("Total expected arrivals for %s: %s", port_code, len(expected_ships))
     
-    print(f"DEBUG: Searching in bbox: {bbox} around port ({port_lat}, {port_lon})")
-
-    try:
-        response = requests.get(url, params=params, timeout=30)
-        response.raise_for_status()
-        reports = response.json().get("reports", [])
-                
-        expected_ships = []
-        seen_mmsi = set()
-        
-        search_terms = []
-        
-        if port_name and str(port_name).strip():
-            port_name_clean = str(port_name).strip().lower()
-            search_terms.append(port_name_clean)                   
-            search_terms.append(port_name_clean.replace(" ", ""))  
-        
-        if alt_name and str(alt_name).strip():
-            alt_name_clean = str(alt_name).strip().lower()
-            search_terms.append(alt_name_clean)                      
-            search_terms.append(alt_name_clean.replace(" ", ""))   
-        
-        if port_code and str(port_code).strip():
-            port_code_clean = str(port_code).strip().lower()
-            search_terms.append(port_code_clean)                    
-            search_terms.append(port_code_clean.replace(" ", ""))   
-        
-        search_terms = [term for term in search_terms if term]
-                
-        if not search_terms:
-            return {"ships": [], "count": 0}
-
-        match_count = 0
-        no_match_count = 0
-        
-        for report in reports:
-            mmsi = report.get("mmsi")
-            if not mmsi or mmsi in seen_mmsi:
-                continue
-
-            point = report.get("point", {})
-            lat, lon = point.get("latitude", 0), point.get("longitude", 0)
-            if lat == 0 or lon == 0:
-                continue
-
-            if geodesic((port_lat, port_lon), (lat, lon)).km > radius_km:
-                continue
-
-            destination = (report.get("destinationName") or "").strip()
-            if not destination:
-                continue
-
-            if ">>" in destination:
-                destination = destination.split(">>")[-1]
-            elif ">" in destination:
-                destination = destination.split(">")[-1]
-            destination = destination.strip()
-                
-            dest_lower = destination.lower()
-            dest_nospace = dest_lower.replace(" ", "")
-            
-            is_match = False
-            matched_term = None
-            for term in search_terms:
-                if term in dest_lower or term in dest_nospace:
-                    is_match = True
-                    matched_term = term
-                    match_count += 1
-                    break
-
-            if not is_match:
-                no_match_count += 1
-                continue
-
-            seen_mmsi.add(mmsi)
-            expected_ships.append({
-                "boatName": report.get("boatName", "").upper(),
-                "mmsi": mmsi,
-                "vesselType": report.get("vesselType"),
-                "destinationName": destination.upper(),
-                "point": point,
-                "speedKmh": report.get("speedKmh"),
-                "bearingDeg": report.get("bearingDeg"),
-                "draughtMeters": report.get("draughtMeters"),
-                "lengthMeters": report.get("lengthMeters"),
-                "widthMeters": report.get("widthMeters"),
-                "imo": report.get("imo")
-            })
-        
-        print(f"DEBUG: Matches: {match_count}, No matches: {no_match_count}")
-        print(f"DEBUG: Total expected arrivals: {len(expected_ships)}")
-        
-        return {"ships": expected_ships, "count": len(expected_ships)}
-
-    except Exception as e:
-        print(f"Error fetching expected arrivals: {e}")
-        return {"ships": [], "count": 0}
\ No newline at end of file
+    return {"ships": expected_ships, "count": len(expected_ships)}
@@ -0,0 +1,163 @@
+import logging
+import math
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class PortRecord:
+    port_code: str
+    port_name: str
+    country_code: str
+    water_body: str
+    lat: float
+    lon: float
+    alt_name: str = ''
+    country: str = ''
+
+def normalize_port_code(code) -> str:
+    """Canonical lookup key: underscores as spaces, trimmed, upper case."""
+    return ' '.join(str(code).replace('_', ' ').split()).upper()
+
+def load_port_data(path='Data/port_details.csv') -> pd.DataFrame:
+    try:
+        return pd.read_csv(path)
+    except Exception as e:
+        logger.error("Error loading port data: %s", e)
+        return pd.DataFrame()
+
+def _text(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    return str(value)
+
+def _search_key(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+class PortIndex:
+    """Port lookups by code, built once from the port DataFrame.
+
+    Every code is reachable as written in the CSV ("MA CAS") and with its
+    spaces removed ("MACAS"), which is how AIS destinations usually spell
+    it. Lookups are dict hits and never touch pandas.
+
+    The water body -> country -> ports cascade behind the route form is
+    precomputed here too, along with sorted key arrays for prefix search.
+    """
+
+    # Search tiers, tried in order: codes, then name starts, then word starts and alternate names
+    SEARCH_TIERS = 3
+
+    def __init__(self, port_df: pd.DataFrame):
+        self._records: Dict[str, PortRecord] = {}
+        self._rows: Dict[str, Dict] = {}
+        self._ports: List[PortRecord] = []
+        self._hierarchy: Dict[str, Dict[str, List[Dict]]] = {}
+        self._search: List[Tuple[List[str], List[str]]] = [([], []) for _ in range(self.SEARCH_TIERS)]
+        self.water_bodies: List[str] = []
+        if port_df.empty:
+            return
+        for row in port_df.to_dict('records'):
+            code = _text(row.get('port_code'))
+            water_body = _text(row.get('water_body'))
+            country_code = _text(row.get('country_code'))
+            if water_body and country_code:
+                self._hierarchy.setdefault(water_body, {}).setdefault(country_code, []).append(
+                    {'port_code': row.get('port_code'), 'port_name': row.get('port_name')}
+                )
+            key = normalize_port_code(code)
+            # First row wins, as the old port_df[...].iloc[0] scans did
+            if not key or key in self._rows:
+                continue
+            self._rows[key] = row
+            self._records[key] = PortRecord(
+                port_code=code,
+                port_name=_text(row.get('port_name')),
+                country_code=_text(row.get('country_code')),
+                water_body=_text(row.get('water_body')),
+                lat=float(row['lat']),
+                lon=float(row['lon']),
+                alt_name=_text(row.get('alt_name')),
+                country=_text(row.get('country'))
+            )
+            self._ports.append(self._records[key])
+        for key in list(self._records):
+            compact = key.replace(' ', '')
+            if compact != key and compact not in self._records:
+                self._records[compact] = self._records[key]
+                self._rows[compact] = self._rows[key]
+        self._build_hierarchy()
+        self._build_search()
+
+    def _build_hierarchy(self):
+        for countries in self._hierarchy.values():
+            for ports in countries.values():
+                ports.sort(key=lambda p: _text(p['port_name']).casefold())
+        self._hierarchy = {
+            water_body: dict(sorted(countries.items()))
+            for water_body, countries in sorted(self._hierarchy.items())
+        }
+        self.water_bodies = list(self._hierarchy)
+
+    def _build_search(self):
+        entries = [set() for _ in range(self.SEARCH_TIERS)]
+        for record in self._ports:
+            canonical = normalize_port_code(record.port_code)
+            entries[0].add((_search_key(canonical), canonical))
+            entries[0].add((_search_key(canonical.replace(' ', '')), canonical))
+            name = _search_key(record.port_name)
+            if name:
+                entries[1].add((name, canonical))
+                words = name.split(' ')
+                for i in range(1, len(words)):
+                    entries[2].add((' '.join(words[i:]), canonical))
+            if record.alt_name:
+                entries[2].add((_search_key(record.alt_name), canonical))
+        for tier, tier_entries in enumerate(entries):
+            ordered = sorted(tier_entries)
+            self._search[tier] = ([k for k, _ in ordered], [c for _, c in ordered])
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def records(self) -> List[PortRecord]:
+        """One record per port, in CSV order."""
+        return self._ports
+
+    def get(self, code) -> Optional[PortRecord]:
+        if not code:
+            return None
+        return self._records.get(normalize_port_code(code))
+
+    def row(self, code) -> Optional[Dict]:
+        """Every CSV column of a port, for the port details page."""
+        if not code:
+            return None
+        return self._rows.get(normalize_port_code(code))
+
+    def get_countries(self, water_body: str) -> List[str]:
+        return list(self._hierarchy.get(water_body, {}))
+
+    def get_ports(self, water_body: str, country_code: str) -> List[Dict]:
+        return self._hierarchy.get(water_body, {}).get(country_code, [])
+
+    def search(self, query: str, limit: int = 10) -> List[PortRecord]:
+        """Ports whose code, name, a word of the name or alternate name start with query."""
+        prefix = _search_key(query or '')
+        if not prefix or limit <= 0:
+            return []
+        found: Dict[str, PortRecord] = {}
+        for keys, codes in self._search:
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix) and len(found) < limit:
+                found.setdefault(codes[i], self._records[codes[i]])
+                i += 1
+            if len(found) >= limit:
+                break
+        return list(found.values())
+
+# Global instance
+port_index = PortIndex(load_port_data())
@@ -0,0 +1,56 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from typing import List, Optional, Tuple
+from port_index import PortIndex, PortRecord, port_index
+from spatial_index import EARTH_RADIUS_KM
+
+def _unit_vectors(lats, lons) -> np.ndarray:
+    lat, lon = np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+def _chord(distance_km):
+    """Straight-line distance through the unit sphere for a great-circle distance."""
+    return 2 * np.sin(np.minimum(np.asarray(distance_km, dtype=np.float64), np.pi * EARTH_RADIUS_KM) / (2 * EARTH_RADIUS_KM))
+
+def _great_circle_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0.0, 1.0))
+
+class PortLocator:
+    """Nearest-port queries over every port with coordinates.
+
+    Ports are points on the unit sphere in a k-d tree. Chord length grows
+    with great-circle distance, so Euclidean neighbours in the tree are the
+    haversine neighbours and radii convert exactly.
+    """
+
+    def __init__(self, index: PortIndex):
+        self.ports: List[PortRecord] = [
+            p for p in index.records() if np.isfinite(p.lat) and np.isfinite(p.lon)
+        ]
+        self._tree = cKDTree(_unit_vectors([p.lat for p in self.ports], [p.lon for p in self.ports])) if self.ports else None
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                max_km: Optional[float] = None) -> List[Tuple[PortRecord, float]]:
+        """Up to k closest ports as (port, distance_km), nearest first."""
+        if self._tree is None or k <= 0:
+            return []
+        k = min(k, len(self.ports))
+        bound = _chord(max_km) if max_km is not None else np.inf
+        chords, idx = self._tree.query(_unit_vectors([lat], [lon])[0], k=k, distance_upper_bound=bound)
+        chords, idx = np.atleast_1d(chords), np.atleast_1d(idx)
+        found = idx < len(self.ports)
+        return [(self.ports[i], float(d)) for i, d in zip(idx[found], _great_circle_km(chords[found]))]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[PortRecord, float]]:
+        """Every port within radius_km as (port, distance_km), nearest first."""
+        if self._tree is None:
+            return []
+        point = _unit_vectors([lat], [lon])[0]
+        idx = np.asarray(self._tree.query_ball_point(point, _chord(radius_km)), dtype=np.int64)
+        distances = _great_circle_km(np.linalg.norm(self._tree.data[idx] - point, axis=1))
+        order = np.argsort(distances)
+        return [(self.ports[i], float(d)) for i, d in zip(idx[order], distances[order])]
+
+# Global instance
+port_locator = PortLocator(port_index)
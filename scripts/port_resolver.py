@@ -0,0 +1,161 @@
+import math
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from port_index import PortIndex, PortRecord, port_index
+from spatial_index import haversine_km
+
+NGRAM = 3
+# Shortest destination fragment matched against part of a port name
+MIN_PARTIAL_DESTINATION = 4
+# Stripped from origin names before matching ("Rotterdam Anch." -> "rotterdam")
+ORIGIN_SUFFIXES = (' anch.', ' anch', ' port')
+
+def clean_destination_name(destination) -> str:
+    """Keep the part of an AIS destination after any >> or > separator."""
+    if not destination:
+        return ""
+    dest = str(destination).strip()
+    if ">>" in dest:
+        dest = dest.split(">>")[-1]
+    elif ">" in dest:
+        dest = dest.split(">")[-1]
+    return dest.strip()
+
+def _normalize(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+def _ngrams(text: str) -> Iterable[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+class PortResolver:
+    """Resolves free-text AIS destinations and origins to ports.
+
+    Names, alternate names and codes are held in exact-match maps, each
+    with and without spaces. Anything else falls back to a trigram index
+    over the space-free names, so a partial name ("ROTTERD") costs a few
+    set lookups instead of a pass over every port, and a name map for text
+    that merely contains a port name ("ROTTERDAM PILOT"). Among several
+    matches the one in the requested country wins, then the earliest in
+    the CSV, unless a destination is resolved near a position, when the
+    closest wins. A destination only resolves from a partial name that is
+    at least MIN_PARTIAL_DESTINATION characters and fits a single port,
+    since a fragment such as "SAN" or "ANT" fits dozens.
+    """
+
+    def __init__(self, index: PortIndex):
+        self._ports: List[PortRecord] = [
+            p for p in index.records() if not (math.isnan(p.lat) or math.isnan(p.lon))
+        ]
+        self._exact: Dict[str, List[int]] = {}
+        self._by_name: Dict[str, List[int]] = {}
+        self._names: List[Tuple[str, ...]] = []
+        self._grams: Dict[str, List[int]] = {}
+        for position, port in enumerate(self._ports):
+            names = tuple(n for n in (_normalize(port.port_name), _normalize(port.alt_name)) if n)
+            compact = tuple(n.replace(' ', '') for n in names)
+            code = _normalize(port.port_code)
+            for key in set(names + compact + (code, code.replace(' ', ''))):
+                if key:
+                    self._exact.setdefault(key, []).append(position)
+            for name in set(names):
+                # Very short names would turn up inside almost any text
+                if len(name) >= NGRAM:
+                    self._by_name.setdefault(name, []).append(position)
+            self._names.append(compact)
+            grams = set()
+            for name in compact:
+                grams |= _ngrams(name)
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(position)
+
+    def _exact_matches(self, text: str) -> List[int]:
+        positions = self._exact.get(text, []) + self._exact.get(text.replace(' ', ''), [])
+        return sorted(set(positions))
+
+    def _containing(self, text: str) -> List[int]:
+        """Ports whose space-free name or alternate name contains text."""
+        compact = text.replace(' ', '')
+        if len(compact) < NGRAM:
+            return []
+        postings = [self._grams.get(gram) for gram in _ngrams(compact)]
+        if not all(postings):
+            return []
+        shortest = min(postings, key=len)
+        return [p for p in shortest if any(compact in name for name in self._names[p])]
+
+    def _contained_in(self, text: str) -> List[int]:
+        """Ports whose whole name or alternate name appears inside text."""
+        positions = set()
+        for start in range(len(text)):
+            for end in range(start + 1, len(text) + 1):
+                positions.update(self._by_name.get(text[start:end], ()))
+        return sorted(positions)
+
+    def _country_matches(self, port: PortRecord, country: str) -> bool:
+        code = port.country_code.lower()
+        if code and (country in code or code in country):
+            return True
+        return bool(port.country) and country in port.country.lower()
+
+    def _best(self, positions: List[int], country: Optional[str], require_country: bool) -> Optional[PortRecord]:
+        if country:
+            for p in positions:
+                if self._country_matches(self._ports[p], country):
+                    return self._ports[p]
+            if require_country:
+                return None
+        return self._ports[positions[0]] if positions else None
+
+    def _destination_positions(self, destination) -> List[int]:
+        text = _normalize(clean_destination_name(destination))
+        if not text:
+            return []
+        for match, unique in ((self._exact_matches, False), (self._containing, True), (self._contained_in, False)):
+            positions = match(text)
+            if unique and (len(positions) > 1 or len(text.replace(' ', '')) < MIN_PARTIAL_DESTINATION):
+                continue
+            if positions:
+                return positions
+        return []
+
+    def destination_candidates(self, destination) -> List[PortRecord]:
+        """Every port an AIS destination may name, e.g. each "VICTORIA".
+
+        Callers that know where the vessel is narrow these down by distance.
+        """
+        return [self._ports[p] for p in self._destination_positions(destination)]
+
+    def resolve_destination(self, destination, country: Optional[str] = None,
+                            near: Optional[Tuple[float, float]] = None) -> Optional[PortRecord]:
+        """Port named by an AIS destination, preferring ports in country when
+        given, then the one closest to near=(lat, lon)."""
+        positions = self._destination_positions(destination)
+        if country and positions:
+            country = _normalize(country)
+            in_country = [p for p in positions if self._country_matches(self._ports[p], country)]
+            positions = in_country or positions
+        if near is not None and len(positions) > 1:
+            distances = haversine_km(near[0], near[1], [self._ports[p].lat for p in positions],
+                                     [self._ports[p].lon for p in positions])
+            return self._ports[positions[int(np.argmin(distances))]]
+        return self._ports[positions[0]] if positions else None
+
+    def resolve_origin(self, origin) -> Optional[PortRecord]:
+        """Port named by a "Port Name, Country" origin string; the country must match."""
+        parts = [_normalize(p) for p in str(origin or '').split(',')]
+        if len(parts) < 2 or not parts[0] or not parts[1]:
+            return None
+        port_search = parts[0]
+        for suffix in ORIGIN_SUFFIXES:
+            port_search = port_search.replace(suffix, '')
+        port_search = port_search.strip()
+        if not port_search:
+            return None
+        for match in (self._exact_matches, self._containing, self._contained_in):
+            port = self._best(match(port_search), parts[1], require_country=True)
+            if port is not None:
+                return port
+        return None
+
+# Global instance
+port_resolver = PortResolver(port_index)
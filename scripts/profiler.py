@@ -0,0 +1,141 @@
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+from config import Config
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(Config.ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, Config.ADMIN_TOKEN)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+class RequestProfile:
+    """Sampling profile plus allocation peak of one request.
+
+    A background thread records the stack of every live thread each
+    interval, so worker pools used by the request show up too; stacks are
+    rooted at the thread name. Concurrent requests on other threads are
+    sampled as well and appear under their own thread names.
+    """
+
+    def __init__(self, label: str, interval_sec: float):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_')}-{uuid.uuid4().hex[:6]}"
+        self.label = label
+        self.interval_sec = interval_sec
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='profiler', daemon=True)
+        self._started_tracemalloc = False
+
+    def _sample(self):
+        names = {}
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_sec):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f'thread-{ident}'))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(Config.PROFILE_TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self, directory: str) -> Dict:
+        self._stop.set()
+        self._thread.join()
+        duration = time.perf_counter() - self.started
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics('lineno')[:Config.PROFILE_TOP_ALLOCATIONS]
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(directory, exist_ok=True)
+        # Collapsed stacks, one "frame;frame;frame count" per line (flamegraph.pl / speedscope)
+        with open(os.path.join(directory, f"{self.id}.collapsed"), 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        summary = {
+            'id': self.id,
+            'label': self.label,
+            'duration_sec': round(duration, 3),
+            'samples': sum(self.stacks.values()),
+            'interval_sec': self.interval_sec,
+            'tracemalloc_peak_bytes': peak,
+            'tracemalloc_current_bytes': current,
+            'top_allocations': [
+                {'location': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count}
+                for stat in top
+            ]
+        }
+        with open(os.path.join(directory, f"{self.id}.json"), 'w') as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+class Profiler:
+    """Runs admin-flagged requests under RequestProfile, one at a time."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or Config.PROFILE_DIR
+        self._busy = threading.Lock()
+
+    def requested(self, flag: Optional[str], token: Optional[str]) -> bool:
+        return Config.PROFILING_ENABLED and flag in ('1', 'true') and is_admin(token)
+
+    def start(self, label: str) -> Optional[RequestProfile]:
+        # Profiling is heavy; a second flagged request while one runs is served unprofiled
+        if not self._busy.acquire(blocking=False):
+            return None
+        try:
+            profile = RequestProfile(label, Config.PROFILE_SAMPLE_INTERVAL_SEC)
+            profile.start()
+            return profile
+        except Exception:
+            self._busy.release()
+            raise
+
+    def finish(self, profile: RequestProfile) -> Dict:
+        try:
+            return profile.stop(self.directory)
+        finally:
+            self._busy.release()
+
+    def list_profiles(self) -> List[Dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summary.pop('top_allocations', None)
+            summary['files'] = [f"{summary['id']}.collapsed", name]
+            profiles.append(summary)
+        return profiles
+
+# Global instance
+profiler = Profiler()
@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from flask import current_app, request
+from config import Config
+from metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def file_version(path: str) -> str:
+    """Version tag of a dataset file, taken when the app loads it."""
+    try:
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except OSError:
+        return 'missing'
+
+class ResponseCache:
+    """Encoded JSON bodies for slow-changing endpoints.
+
+    Entries are keyed by request key and hold the data version they were
+    built from, a strong ETag and gzip (and brotli, when installed)
+    variants compressed once at build time. A request whose version no
+    longer matches rebuilds the entry.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _build(self, version, obj):
+        body = current_app.json.dumps(obj).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        variants = {'identity': body}
+        if len(body) >= Config.RESPONSE_COMPRESS_MIN_BYTES:
+            variants['gzip'] = gzip.compress(body, compresslevel=9)
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, quality=11)
+        return {'version': version, 'digest': digest, 'variants': variants}
+
+    def _lookup(self, key, version, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry['version'] == version
+            if hit:
+                self._entries.move_to_end(key)
+        metrics.cache_lookup('response', hit)
+        if hit:
+            return entry
+        # Build outside the lock; concurrent misses just build the same body twice
+        entry = self._build(version, build())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, prefix=''):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def respond(self, key: str, version: str, build):
+        """Serve build()'s JSON for key, reusing the cached encoding while version holds."""
+        entry = self._lookup(key, version, build)
+        variants = entry['variants']
+        accepted = request.accept_encodings
+        encoding = next((e for e in ('br', 'gzip') if e in variants and accepted[e]), 'identity')
+        # Each encoding is a different representation, so it gets its own strong ETag
+        etag = entry['digest'] if encoding == 'identity' else f"{entry['digest']}-{encoding}"
+
+        response = current_app.response_class(mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+
+        response.set_data(variants[encoding])
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+# Global instance
+response_cache = ResponseCache()
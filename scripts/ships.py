@@ -1,8 +1,18 @@
+import logging
 import os
 import requests
 import math
-from geopy.distance import geodesic
+import time
+import numpy as np
 from dotenv import load_dotenv
+from config import Config
+from vessel_table import vessel_table
+from track_store import track_store
+from spatial_index import haversine_km
+from metrics import metrics
+from ais_reports import SUMMARY_FIELDS, DETAIL_FIELDS, iter_json_array, iter_normalized, normalize_report, normalize_reports
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -27,85 +37,202 @@ def calculate_bbox_around_point(lat, lon, radius_km):
 def format_bbox_for_api(bbox_dict):
     return f"{bbox_dict['lat_min']},{bbox_dict['lon_min']};{bbox_dict['lat_max']},{bbox_dict['lon_max']}"
 
-def get_ships_in_bbox(bbox_dict, api_key=None, radius_fallback_km=50):
+def parse_bbox(area):
+    sw, ne = area.split(';')
+    sw_lat, sw_lon = map(float, sw.split(','))
+    ne_lat, ne_lon = map(float, ne.split(','))
+    return sw_lat, sw_lon, ne_lat, ne_lon
+
+def _ais_request_params(area, moving=1, api_key=None):
+    """MarinePlan query parameters shared by the buffered and streaming fetches."""
     if not api_key:
         api_key = os.getenv('MARINEPLAN_API_KEY')
         if not api_key:
             api_key = '<YOUR MARINE API KEY>'
     
-    api_bbox_format = format_bbox_for_api(bbox_dict)
-    
-    url = "https://ais.marineplan.com/location/2/locations.json"
     params = {
-        'area': api_bbox_format,
-        'moving': 1,
-        'maxage': 1800,
+        'area': area,
+        'maxage': Config.SHIP_MAX_AGE,
         'source': 'AIS',
         'key': api_key
     }
+    if moving is not None:
+        params['moving'] = moving
+    return params
+
+def fetch_ais_reports(area, moving=1, api_key=None, timeout=10):
+    params = _ais_request_params(area, moving, api_key)
     
-    try:
-        response = requests.get(url, params=params, timeout=10)
+    with metrics.upstream('marineplan'):
+        response = requests.get(Config.MARINEPLAN_API_URL, params=params, timeout=timeout)
         response.raise_for_status()
-        data = response.json()
+        reports = response.json().get('reports', [])
+    
+    # Every AIS response feeds the vessel track history
+    track_store.append_reports(reports)
+    return reports
+
+def iter_ais_reports(area, moving=1, api_key=None, timeout=10):
+    """Streaming variant of fetch_ais_reports.
+
+    Reports are parsed out of the response body while it downloads and fed
+    to the track store and vessel table in batches. Closing the generator
+    early (e.g. once a limit is reached) drops the upstream connection.
+    """
+    params = _ais_request_params(area, moving, api_key)
+    
+    batch = []
+    try:
+        with metrics.upstream('marineplan'), requests.get(Config.MARINEPLAN_API_URL, params=params, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            response.encoding = response.encoding or 'utf-8'
+            chunks = response.iter_content(chunk_size=Config.AIS_STREAM_CHUNK_BYTES, decode_unicode=True)
+            for report in iter_json_array(chunks, 'reports'):
+                batch.append(report)
+                if len(batch) >= Config.AIS_STREAM_BATCH_SIZE:
+                    track_store.append_reports(batch)
+                    vessel_table.upsert_reports(batch)
+                    batch = []
+                yield report
+    finally:
+        track_store.append_reports(batch)
+        vessel_table.upsert_reports(batch)
+        vessel_table.refresh()
+
+def get_area_reports(area, moving=1, api_key=None, timeout=10):
+    # Serve from the in-memory table when background ingestion covers the box,
+    # otherwise go upstream and keep whatever we fetched
+    sw_lat, sw_lon, ne_lat, ne_lon = parse_bbox(area)
+    covered = Config.AIS_INGEST_ENABLED and vessel_table.covers(sw_lat, sw_lon, ne_lat, ne_lon, include_stationary=not moving)
+    metrics.cache_lookup('vessel_table', covered)
+    if covered:
+        return vessel_table.query_reports(sw_lat, sw_lon, ne_lat, ne_lon, moving_only=bool(moving))
+    
+    reports = fetch_ais_reports(area, moving, api_key, timeout)
+    vessel_table.upsert_reports(reports)
+    vessel_table.refresh()
+    return reports
+
+def get_area_snapshot(area, moving=1, api_key=None, timeout=10):
+    """Vessel table snapshot holding every vessel in area, fetching it if ingestion does not."""
+    sw_lat, sw_lon, ne_lat, ne_lon = parse_bbox(area)
+    covered = Config.AIS_INGEST_ENABLED and vessel_table.covers(sw_lat, sw_lon, ne_lat, ne_lon, include_stationary=not moving)
+    metrics.cache_lookup('vessel_table', covered)
+    if not covered:
+        reports = fetch_ais_reports(area, moving, api_key, timeout)
+        vessel_table.upsert_reports(reports)
+        vessel_table.refresh()
+        # Only this box's vessels, so its destination index covers the box, not the table
+        return vessel_table.snapshot_of(reports)
+    return vessel_table.snapshot
+
+def report_positions(reports):
+    lats = np.array([(r.get('point') or {}).get('latitude', 0) or 0 for r in reports], dtype=np.float64)
+    lons = np.array([(r.get('point') or {}).get('longitude', 0) or 0 for r in reports], dtype=np.float64)
+    return lats, lons
+
+def vessel_summary(report, fields=SUMMARY_FIELDS):
+    return normalize_report(report, fields)
+
+def get_vessels_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, limit=0, moving=1, api_key=None, fields=SUMMARY_FIELDS, filters=None):
+    bbox = f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}"
+    # The limit applies after the bounds check: dead-reckoned table rows can drift out of the box
+    reports = get_area_reports(bbox, moving=moving, api_key=api_key)
+    
+    # STRICT: verify ships are within bounds and have a real position
+    lats, lons = report_positions(reports)
+    mask = (lats != 0.0) & (lons != 0.0) & (lats >= sw_lat) & (lats <= ne_lat) & (lons >= sw_lon) & (lons <= ne_lon)
+    return list(iter_normalized((reports[i] for i in np.flatnonzero(mask)), fields, filters, limit))
+
+def iter_vessels_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, limit=0, moving=1, api_key=None, timeout=30,
+                         fields=SUMMARY_FIELDS, filters=None):
+    """Yield vessel summaries for a box one at a time, stopping at limit."""
+    if Config.AIS_INGEST_ENABLED and vessel_table.covers(sw_lat, sw_lon, ne_lat, ne_lon, include_stationary=not moving):
+        # Limited after the bounds check below, like get_vessels_in_bbox
+        reports = vessel_table.query_reports(sw_lat, sw_lon, ne_lat, ne_lon, moving_only=bool(moving))
+    else:
+        reports = iter_ais_reports(f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}", moving, api_key, timeout)
+    
+    def in_bounds(report):
+        point = report.get('point') or {}
+        lat, lon = point.get('latitude', 0) or 0, point.get('longitude', 0) or 0
+        return sw_lat <= lat <= ne_lat and sw_lon <= lon <= ne_lon
+    
+    try:
+        # STRICT: verify ships are within bounds; the filter rejects missing positions
+        yield from iter_normalized(filter(in_bounds, reports), fields, filters, limit)
+    finally:
+        if hasattr(reports, 'close'):
+            reports.close()
+
+def get_vessel_changes_in_bbox(sw_lat, sw_lon, ne_lat, ne_lon, since, limit=0, api_key=None, fields=SUMMARY_FIELDS, filters=None):
+    # Refresh the box (from the table or upstream) so the snapshot is current,
+    # then answer from the snapshot diff history
+    covered = Config.AIS_INGEST_ENABLED and vessel_table.covers(sw_lat, sw_lon, ne_lat, ne_lon)
+    get_area_reports(f"{sw_lat},{sw_lon};{ne_lat},{ne_lon}", moving=1, api_key=api_key)
+    
+    snapshot = vessel_table.snapshot
+    previous = vessel_table.changes_since(since)
+    if previous is None:
+        return None
+    
+    rows = snapshot.query_bbox(sw_lat, sw_lon, ne_lat, ne_lon, moving_only=True)
+    in_box = {int(m) for m in snapshot.mmsi[rows]}
+    changed_rows = [row for row in rows if int(snapshot.mmsi[row]) in previous]
+    filtered = filters is not None and not filters.is_empty
+    if limit > 0 and not filtered:
+        changed_rows = changed_rows[:limit]
+    
+    # Positions come from the same source as a full response: dead-reckoned
+    # when the table serves the box, as reported when upstream does
+    ref_time = time.time() if covered else None
+    reports = snapshot.to_reports(changed_rows, ref_time=ref_time)
+    vessels = list(iter_normalized(reports, fields, filters, limit))
+    
+    def was_sent(record):
+        # Whether the client's response at `since` held this vessel
+        return (record is not None and sw_lat <= record.lat <= ne_lat and sw_lon <= record.lon <= ne_lon
+                and (not filtered or filters.matches(record.to_report())))
+    
+    removed = [mmsi for mmsi, record in previous.items() if mmsi not in in_box and was_sent(record)]
+    # A vessel that stopped matching the filters leaves the client's view too
+    if filtered:
+        removed.extend(
+            report['mmsi'] for report in reports
+            if not filters.matches(report) and was_sent(previous[int(report['mmsi'])])
+        )
+    return snapshot.token, vessels, removed
+
+def get_ships_in_bbox(bbox_dict, api_key=None, radius_fallback_km=50):
+    if not api_key:
+        api_key = os.getenv('MARINEPLAN_API_KEY')
+        if not api_key:
+            api_key = '<YOUR MARINE API KEY>'
+    
+    api_bbox_format = format_bbox_for_api(bbox_dict)
+    
+    try:
+        reports = get_area_reports(api_bbox_format, moving=1, api_key=api_key)
         
         # If no results, try with centroid and radius
-        if not data.get('reports'):
+        if not reports:
             center_lat, center_lon = calculate_centroid(
                 bbox_dict['lat_min'], bbox_dict['lon_min'],
                 bbox_dict['lat_max'], bbox_dict['lon_max']
             )
             new_bbox = calculate_bbox_around_point(center_lat, center_lon, radius_fallback_km)
-            params['area'] = new_bbox
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            reports = get_area_reports(new_bbox, moving=1, api_key=api_key)
         
-        # Filter reports for relevant vessel types and valid coordinates
-        filtered_reports = []
-        for report in data.get('reports', []):
-            vessel_type = report.get('vesselType')
-                
-            point = report.get('point', {})
-            # Skip if coordinates are missing or zero
-            if point.get('latitude', 0) == 0.0 or point.get('longitude', 0) == 0.0:
-                continue
-            
-            filtered_report = {
-                'boatName': report.get('boatName', '').upper(),
-                'mmsi': report.get('mmsi'),
-                'country': report.get('country'),
-                'vesselType': report.get('vesselType'),
-                'point': report.get('point'),
-                'destinationName': report.get('destinationName', '').upper(),
-                'boundingBox': report.get('boundingBox'),
-                'speedKmh': report.get('speedKmh'),
-                'bearingDeg': report.get('bearingDeg'),
-                'draughtMeters': report.get('draughtMeters'),
-                'lengthMeters': report.get('lengthMeters'),
-                'widthMeters': report.get('widthMeters'),
-                'imo': report.get('imo'),
-                'callSign': report.get('callSign'),
-                'timeSecUtc': report.get('timeSecUtc'),
-                'etaSecUtc': report.get('etaSecUtc'),
-                'destination': report.get('destination'),
-                'heightMeters': report.get('heightMeters'),
-                'id': report.get('id'),
-                'fuelType': report.get('fuelType'),
-                'captain': report.get('captain'),
-                'phone': report.get('phone'),
-                'atis': report.get('atis')
-            }
-            filtered_reports.append(filtered_report)
+        # Keep only reports with valid coordinates
+        filtered_reports = normalize_reports(reports, DETAIL_FIELDS)
         
         return filtered_reports
         
     except requests.RequestException as e:
-        print(f"Error fetching ship data: {e}")
+        logger.error("Error fetching ship data: %s", e)
         return []
     except Exception as e:
-        print(f"Error processing ship data: {e}")
+        logger.error("Error processing ship data: %s", e)
         return []
 
 def get_ships_for_disasters(disasters, api_key=None):
@@ -133,54 +260,22 @@ def get_ships_near_port(port_lat, port_lon, radius_km=None, threshold=None, api_
             api_key = '<YOUR MARINE API KEY>'
     
     if radius_km is None:
-        from config import Config
         radius_km = Config.PORT_CONGESTION_RADIUS_KM
     
     if threshold is None:
-        from config import Config
         threshold = Config.PORT_CONGESTION_THRESHOLD
     
     # Calculate bounding box around port
     bbox = calculate_bbox_around_point(port_lat, port_lon, radius_km)
     
-    url = "https://ais.marineplan.com/location/2/locations.json"
-    params = {
-        'area': bbox,
-        'moving': 0,  # include both moving and stationary ships
-        'maxage': 1800,
-        'source': 'AIS',
-        'key': api_key
-    }
-    
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        reports = get_area_reports(bbox, moving=0, api_key=api_key)  # include both moving and stationary ships
         
-        filtered_ships = []
-        for report in data.get('reports', []):
-            point = report.get('point', {})
-            if point.get('latitude', 0) == 0.0 or point.get('longitude', 0) == 0.0:
-                continue
-            
-            # Check actual distance from port
-            distance = geodesic((port_lat, port_lon), (point['latitude'], point['longitude'])).km
-            if distance <= radius_km:
-                ship_info = {
-                    'boatName': report.get('boatName', '').upper(),
-                    'mmsi': report.get('mmsi'),
-                    'country': report.get('country'),
-                    'vesselType': report.get('vesselType'),
-                    'point': point,
-                    'destinationName': report.get('destinationName', '').upper(),
-                    'speedKmh': report.get('speedKmh'),
-                    'bearingDeg': report.get('bearingDeg'),
-                    'draughtMeters': report.get('draughtMeters'),
-                    'lengthMeters': report.get('lengthMeters'),
-                    'widthMeters': report.get('widthMeters'),
-                    'imo': report.get('imo')
-                }
-                filtered_ships.append(ship_info)
+        # Check actual distance from port
+        lats, lons = report_positions(reports)
+        distances = haversine_km(port_lat, port_lon, lats, lons)
+        in_radius = (lats != 0.0) & (lons != 0.0) & (distances <= radius_km)
+        filtered_ships = [vessel_summary(reports[i]) for i in np.flatnonzero(in_radius)]
         
         ship_count = len(filtered_ships)
         congested = ship_count > threshold
@@ -194,8 +289,8 @@ def get_ships_near_port(port_lat, port_lon, radius_km=None, threshold=None, api_
         }
         
     except requests.RequestException as e:
-        print(f"Error fetching port congestion data: {e}")
+        logger.error("Error fetching port congestion data: %s", e)
         return {'congested': False, 'ship_count': 0, 'error': str(e), 'ships': []}
     except Exception as e:
-        print(f"Error processing port congestion data: {e}")
+        logger.error("Error processing port congestion data: %s", e)
         return {'congested': False, 'ship_count': 0, 'error': str(e), 'ships': []}
\ No newline at end of file
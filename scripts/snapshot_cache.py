@@ -0,0 +1,63 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from config import Config
+from metrics import metrics
+
+class SnapshotCache:
+    """Short-lived server-side copies of vessel responses.
+
+    Vessel endpoints hand out the id; follow-up endpoints (disasters,
+    ECA/MPA, collisions) accept it instead of refetching the same AIS box
+    or receiving the vessel list back from the browser.
+    """
+
+    def __init__(self, ttl_sec=None, max_entries=None):
+        self.ttl_sec = ttl_sec or Config.SNAPSHOT_TTL_SEC
+        self.max_entries = max_entries or Config.SNAPSHOT_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def put(self, vessels: List[Dict], bounds: Optional[Dict] = None) -> str:
+        snapshot_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[snapshot_id] = {
+                'vessels': vessels,
+                'bounds': bounds,
+                'expires_at': time.time() + self.ttl_sec
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot_id
+
+    def replace(self, snapshot_id: Optional[str], vessels: List[Dict], bounds: Optional[Dict] = None) -> str:
+        """Point an existing id at new vessels, e.g. a stream's latest state.
+
+        Falls back to a new id if the old one expired or was evicted.
+        """
+        with self._lock:
+            if snapshot_id in self._entries:
+                self._entries[snapshot_id] = {
+                    'vessels': vessels,
+                    'bounds': bounds,
+                    'expires_at': time.time() + self.ttl_sec
+                }
+                self._entries.move_to_end(snapshot_id)
+                return snapshot_id
+        return self.put(vessels, bounds)
+
+    def get(self, snapshot_id: Optional[str]) -> Optional[Dict]:
+        if not snapshot_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(snapshot_id)
+            if entry is not None and entry['expires_at'] < time.time():
+                del self._entries[snapshot_id]
+                entry = None
+        metrics.cache_lookup('snapshot', entry is not None)
+        return entry
+
+# Global instance
+snapshot_cache = SnapshotCache()
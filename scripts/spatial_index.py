@@ -0,0 +1,90 @@
+import numpy as np
+from typing import Optional
+from config import Config
+
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat, lon, lats, lons) -> np.ndarray:
+    """Great-circle distance from one point to many, in km."""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def bbox_around_point(lat, lon, radius_km):
+    delta_lat = np.degrees(radius_km / EARTH_RADIUS_KM)
+    delta_lon = np.degrees(radius_km / (EARTH_RADIUS_KM * max(np.cos(np.radians(lat)), 1e-6)))
+    return lat - delta_lat, lon - delta_lon, lat + delta_lat, lon + delta_lon
+
+class GridIndex:
+    """Uniform lat/lon grid over a fixed set of points.
+
+    Points are sorted by cell id once at build time; a query walks the cell
+    rows the box touches and slices each contiguous run with searchsorted,
+    then does one exact vectorized test on the candidates. Returned values
+    are row indices into the arrays the index was built from.
+    """
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, cell_deg: Optional[float] = None):
+        self.cell_deg = cell_deg or Config.VESSEL_GRID_CELL_DEG
+        self.n_rows = int(np.ceil(180.0 / self.cell_deg)) + 1
+        self.n_cols = int(np.ceil(360.0 / self.cell_deg)) + 1
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+
+        valid = np.isfinite(self.lats) & np.isfinite(self.lons)
+        cell_ids = np.full(len(self.lats), -1, dtype=np.int64)
+        cell_ids[valid] = self._cell_row(self.lats[valid]) * self.n_cols + self._cell_col(self.lons[valid])
+
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.sorted_cells = cell_ids[self.order]
+
+    def _cell_row(self, lats):
+        return np.clip(((np.asarray(lats) + 90.0) // self.cell_deg).astype(np.int64), 0, self.n_rows - 1)
+
+    def _cell_col(self, lons):
+        return np.clip(((np.asarray(lons) + 180.0) // self.cell_deg).astype(np.int64), 0, self.n_cols - 1)
+
+    def _candidates(self, sw_lat, sw_lon, ne_lat, ne_lon) -> np.ndarray:
+        row0, row1 = self._cell_row(sw_lat), self._cell_row(ne_lat)
+        col0, col1 = self._cell_col(sw_lon), self._cell_col(ne_lon)
+        rows = np.arange(row0, row1 + 1, dtype=np.int64)
+        starts = np.searchsorted(self.sorted_cells, rows * self.n_cols + col0, side='left')
+        ends = np.searchsorted(self.sorted_cells, rows * self.n_cols + col1, side='right')
+        if not len(rows) or not np.any(ends > starts):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.order[s:e] for s, e in zip(starts, ends) if e > s])
+
+    def query_bbox(self, sw_lat, sw_lon, ne_lat, ne_lon) -> np.ndarray:
+        if sw_lon > ne_lon:
+            # Box crosses the antimeridian
+            return np.union1d(
+                self.query_bbox(sw_lat, sw_lon, ne_lat, 180.0),
+                self.query_bbox(sw_lat, -180.0, ne_lat, ne_lon)
+            )
+        cand = self._candidates(sw_lat, sw_lon, ne_lat, ne_lon)
+        lats, lons = self.lats[cand], self.lons[cand]
+        mask = (lats >= sw_lat) & (lats <= ne_lat) & (lons >= sw_lon) & (lons <= ne_lon)
+        return np.sort(cand[mask])
+
+    def query_radius(self, lat, lon, radius_km) -> np.ndarray:
+        sw_lat, sw_lon, ne_lat, ne_lon = bbox_around_point(lat, lon, radius_km)
+        if ne_lon - sw_lon >= 360.0:
+            sw_lon, ne_lon = -180.0, 180.0
+        elif sw_lon < -180.0:
+            sw_lon += 360.0  # query_bbox splits the box at the antimeridian
+        elif ne_lon > 180.0:
+            ne_lon -= 360.0
+        cand = self.query_bbox(max(sw_lat, -90.0), sw_lon, min(ne_lat, 90.0), ne_lon)
+        dist = haversine_km(lat, lon, self.lats[cand], self.lons[cand])
+        return cand[dist <= radius_km]
+
+    def query_polygon(self, polygon) -> np.ndarray:
+        """Rows inside a shapely polygon given in (lon, lat) order."""
+        import shapely
+        min_lon, min_lat, max_lon, max_lat = polygon.bounds
+        cand = self.query_bbox(min_lat, min_lon, max_lat, max_lon)
+        inside = shapely.contains_xy(polygon, self.lons[cand], self.lats[cand])
+        return cand[inside]
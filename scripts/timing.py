@@ -0,0 +1,70 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List
+
+class RequestTimer:
+    """Named spans for one request.
+
+    Each span records wall time and the CPU time of the thread that ran it;
+    the difference is time spent waiting, mostly on upstream services.
+    Spans may run concurrently on worker threads, so they can overlap.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict] = []
+
+    @contextmanager
+    def span(self, name: str):
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            cpu_ms = (time.thread_time() - cpu_start) * 1000
+            with self._lock:
+                self.spans.append({
+                    'name': name,
+                    'start_ms': round((wall_start - self.started) * 1000, 1),
+                    'wall_ms': round(wall_ms, 1),
+                    'cpu_ms': round(cpu_ms, 1),
+                    'wait_ms': round(max(wall_ms - cpu_ms, 0.0), 1)
+                })
+
+    def wrap(self, name: str, func):
+        """func timed as span name, for handing to an executor.
+
+        The caller's context variables (and with them the Flask request
+        context) are carried over to the worker thread.
+        """
+        context = contextvars.copy_context()
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with self.span(name):
+                return context.run(func, *args, **kwargs)
+        return timed
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def server_timing(self) -> str:
+        entries = [
+            f'{span["name"]};dur={span["wall_ms"]};desc="cpu {span["cpu_ms"]}ms, wait {span["wait_ms"]}ms"'
+            for span in self.spans
+        ]
+        entries.append(f'total;dur={self.total_ms()}')
+        return ', '.join(entries)
+
+    def as_dict(self) -> Dict:
+        return {'total_ms': self.total_ms(), 'spans': list(self.spans)}
+
+    def summary(self) -> str:
+        return ', '.join(
+            f"{span['name']}={span['wall_ms']}ms (cpu {span['cpu_ms']}ms, wait {span['wait_ms']}ms)"
+            for span in sorted(self.spans, key=lambda s: s['wall_ms'], reverse=True)
+        )
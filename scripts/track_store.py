@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, every process writes as before
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+POINT_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('lat', '<f4'),
+    ('lon', '<f4'),
+    ('speed', '<f4'),
+    ('bearing', '<f4'),
+])
+
+SLOT_DTYPE = np.dtype([
+    ('mmsi', '<i8'),
+    ('head', '<i4'),    # next write position in the ring
+    ('count', '<i4'),
+    ('last_time', '<f8'),
+    ('last_lat', '<f4'),
+    ('last_lon', '<f4'),
+])
+
+TRAIL_FIELDS = ['timeSecUtc', 'lat', 'lon', 'speedKmh', 'bearingDeg']
+
+class TrackStore:
+    """Fixed-size per-MMSI ring buffers of recent fixes in a memory-mapped file.
+
+    The file holds a slot table followed by max_vessels rings of capacity
+    points each. When every slot is taken the vessel that reported least
+    recently is evicted. Only one process writes a given file: the first
+    to take an exclusive lock on path + '.lock'. Other processes (e.g. the
+    remaining gunicorn workers) map it read-only and drop their appends.
+    """
+
+    def __init__(self, path=None, max_vessels=None, capacity=None):
+        self.path = path or Config.TRACK_STORE_PATH
+        self.max_vessels = max_vessels or Config.TRACK_STORE_MAX_VESSELS
+        self.capacity = capacity or Config.TRACK_STORE_POINTS_PER_VESSEL
+        self._lock = threading.Lock()
+        self._slot_of: Dict[int, int] = {}
+        self._last_flush = time.time()
+        self.slots = None
+        self.points = None
+        self.enabled = False
+        self.writable = False
+        self._lock_file = None
+
+    def _slots_bytes(self) -> int:
+        return SLOT_DTYPE.itemsize * self.max_vessels
+
+    def _expected_size(self) -> int:
+        return self._slots_bytes() + POINT_DTYPE.itemsize * self.max_vessels * self.capacity
+
+    def _acquire_writer_lock(self) -> bool:
+        if fcntl is None:
+            return True
+        lock_file = open(self.path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held for the life of the process; the OS releases it if the process dies
+        self._lock_file = lock_file
+        return True
+
+    def _map(self, mode: str):
+        self.slots = np.memmap(self.path, dtype=SLOT_DTYPE, mode=mode, shape=(self.max_vessels,))
+        self.points = np.memmap(self.path, dtype=POINT_DTYPE, mode=mode, offset=self._slots_bytes(),
+                                shape=(self.max_vessels, self.capacity))
+
+    def open(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.writable = self._acquire_writer_lock()
+            self.enabled = True
+            if not self.writable:
+                # The writer may still be creating the file; _ready() maps it on first read
+                logger.info("Track store %s is written by another process, reading only", self.path)
+                return
+
+            expected_size = self._expected_size()
+            fresh = not os.path.exists(self.path) or os.path.getsize(self.path) != expected_size
+            if fresh:
+                # Layout changed or first run: start with an empty, zeroed file
+                with open(self.path, 'wb') as f:
+                    f.truncate(expected_size)
+
+            self._map('r+')
+            self._slot_of = {int(m): i for i, m in enumerate(self.slots['mmsi']) if m != 0}
+            logger.info("Track store opened with %s vessels (%s)", len(self._slot_of), self.path)
+        except Exception as e:
+            logger.error("Error opening track store: %s", e)
+            self.enabled = False
+
+    def _ready(self) -> bool:
+        if not self.enabled:
+            return False
+        if self.slots is None:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) == self._expected_size():
+                    self._map('r')
+            except Exception as e:
+                logger.error("Error mapping track store: %s", e)
+        return self.slots is not None
+
+    def _find_slot(self, mmsi: int) -> Optional[int]:
+        if self.writable:
+            return self._slot_of.get(mmsi)
+        # Readers scan the slot table, since the writer assigns slots as vessels appear
+        found = np.flatnonzero(self.slots['mmsi'] == mmsi)
+        return int(found[0]) if len(found) else None
+
+    def _slot_for(self, mmsi: int) -> int:
+        slot = self._slot_of.get(mmsi)
+        if slot is not None:
+            return slot
+
+        free = np.flatnonzero(self.slots['mmsi'] == 0)
+        if len(free):
+            slot = int(free[0])
+        else:
+            slot = int(np.argmin(self.slots['last_time']))
+            del self._slot_of[int(self.slots['mmsi'][slot])]
+
+        self.slots[slot] = (mmsi, 0, 0, 0.0, 0.0, 0.0)
+        self._slot_of[mmsi] = slot
+        return slot
+
+    def append_reports(self, reports: List[Dict]):
+        if not self.enabled or not self.writable or not reports:
+            return
+        now = time.time()
+        with self._lock:
+            for report in reports:
+                try:
+                    mmsi = int(report.get('mmsi') or 0)
+                except (TypeError, ValueError):
+                    continue
+                point = report.get('point') or {}
+                lat, lon = point.get('latitude', 0), point.get('longitude', 0)
+                if not mmsi or lat == 0.0 or lon == 0.0:
+                    continue
+                t = float(report.get('timeSecUtc') or now)
+
+                slot = self._slot_for(mmsi)
+                meta = self.slots[slot]
+                if meta['count'] and t <= meta['last_time']:
+                    continue  # same fix seen through another endpoint
+
+                head = int(meta['head'])
+                self.points[slot, head] = (
+                    t, lat, lon,
+                    report.get('speedKmh') or 0.0,
+                    report.get('bearingDeg') or 0.0
+                )
+                self.slots[slot] = (
+                    mmsi, (head + 1) % self.capacity, min(int(meta['count']) + 1, self.capacity),
+                    t, lat, lon
+                )
+
+            if now - self._last_flush > Config.TRACK_STORE_FLUSH_SEC:
+                self.points.flush()
+                self.slots.flush()
+                self._last_flush = now
+
+    def _ring(self, slot: int, since: float) -> np.ndarray:
+        meta = self.slots[slot]
+        count, head = int(meta['count']), int(meta['head'])
+        if count < self.capacity:
+            ring = self.points[slot, :count]
+        else:
+            ring = np.concatenate([self.points[slot, head:], self.points[slot, :head]])
+        return ring[ring['time'] >= since]
+
+    @staticmethod
+    def _as_rows(ring: np.ndarray) -> List[List[float]]:
+        return [
+            [float(p['time']), float(p['lat']), float(p['lon']), float(p['speed']), float(p['bearing'])]
+            for p in ring
+        ]
+
+    def get_trail(self, mmsi: int, hours: float) -> Optional[List[List[float]]]:
+        if not self._ready():
+            return None
+        since = time.time() - hours * 3600
+        with self._lock:
+            slot = self._find_slot(int(mmsi))
+            if slot is None:
+                return None
+            return self._as_rows(self._ring(slot, since))
+
+    def get_trails_in_bbox(self, sw_lat: float, sw_lon: float, ne_lat: float, ne_lon: float,
+                           hours: float, limit: int = 0) -> Dict[str, List[List[float]]]:
+        """Trails of every vessel whose latest fix lies in the box."""
+        if not self._ready():
+            return {}
+        since = time.time() - hours * 3600
+        with self._lock:
+            lat, lon = self.slots['last_lat'], self.slots['last_lon']
+            mask = ((self.slots['mmsi'] != 0) & (self.slots['last_time'] >= since) &
+                    (lat >= sw_lat) & (lat <= ne_lat) & (lon >= sw_lon) & (lon <= ne_lon))
+            slots = np.flatnonzero(mask)
+            if limit > 0:
+                slots = slots[:limit]
+            return {
+                str(int(self.slots['mmsi'][slot])): self._as_rows(self._ring(int(slot), since))
+                for slot in slots
+            }
+
+# Global instance
+track_store = TrackStore()
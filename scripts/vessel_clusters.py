@@ -0,0 +1,79 @@
+import threading
+import numpy as np
+from typing import Dict, List
+from config import Config
+from spatial_index import GridIndex
+
+class ClusterLevel:
+    """Grid clusters of one zoom level, indexed by centroid."""
+
+    def __init__(self, cell_ids: np.ndarray, lats: np.ndarray, lons: np.ndarray,
+                 type_code: np.ndarray, n_types: int, cell_deg: float):
+        self.cell_deg = cell_deg
+        self.cells, inverse, self.counts = np.unique(cell_ids, return_inverse=True, return_counts=True)
+        self.lat = np.bincount(inverse, weights=lats) / self.counts
+        self.lon = np.bincount(inverse, weights=lons) / self.counts
+        # Row c holds the per-type vessel counts of cluster c
+        self.type_counts = np.bincount(
+            inverse * n_types + type_code, minlength=len(self.cells) * n_types
+        ).reshape(len(self.cells), n_types)
+        self.index = GridIndex(self.lat, self.lon, cell_deg=max(cell_deg, Config.VESSEL_GRID_CELL_DEG))
+
+class VesselClusters:
+    """Hierarchical grid clustering of the moving vessels in a snapshot.
+
+    Vessels are bucketed once on the finest grid; each coarser zoom level
+    halves the resolution, so its cell is the finest cell shifted right by
+    the level difference. Each level is built the first time its zoom is
+    queried and kept, so later queries are an index lookup, and a snapshot
+    that only serves one request builds just the level it asked for.
+    """
+
+    def __init__(self, snapshot, max_zoom=None, base_cell_deg=None):
+        self.max_zoom = Config.CLUSTER_MAX_ZOOM if max_zoom is None else max_zoom
+        self.base_cell_deg = base_cell_deg or Config.CLUSTER_BASE_CELL_DEG
+        self.type_names = snapshot.type_names
+
+        rows = snapshot.moving_rows(np.arange(len(snapshot), dtype=np.int64))
+        rows = rows[np.isfinite(snapshot.lat[rows]) & np.isfinite(snapshot.lon[rows])]
+        lats, lons = snapshot.lat[rows], snapshot.lon[rows]
+        type_code = snapshot.type_code[rows].astype(np.int64)
+
+        self._lats, self._lons, self._type_code = lats, lons, type_code
+        self._finest_deg = self.base_cell_deg / 2 ** self.max_zoom
+        self._fine_row = np.clip(((lats + 90.0) // self._finest_deg).astype(np.int64), 0, None)
+        self._fine_col = np.clip(((lons + 180.0) // self._finest_deg).astype(np.int64), 0, None)
+
+        self.levels: Dict[int, ClusterLevel] = {}
+        self._lock = threading.Lock()
+
+    def level(self, zoom: int) -> ClusterLevel:
+        zoom = max(0, min(int(zoom), self.max_zoom))
+        with self._lock:
+            level = self.levels.get(zoom)
+            if level is None:
+                shift = self.max_zoom - zoom
+                cell_deg = self._finest_deg * 2 ** shift
+                n_cols = int(np.ceil(360.0 / cell_deg)) + 1
+                level = self.levels[zoom] = ClusterLevel(
+                    (self._fine_row >> shift) * n_cols + (self._fine_col >> shift),
+                    self._lats, self._lons, self._type_code,
+                    max(len(self.type_names), 1), cell_deg
+                )
+            return level
+
+    def query(self, sw_lat: float, sw_lon: float, ne_lat: float, ne_lon: float, zoom: int) -> List[Dict]:
+        level = self.level(zoom)
+        clusters = []
+        for c in level.index.query_bbox(sw_lat, sw_lon, ne_lat, ne_lon):
+            types = {
+                self.type_names[t] or 'UNKNOWN': int(n)
+                for t, n in enumerate(level.type_counts[c]) if n
+            }
+            clusters.append({
+                'lat': float(level.lat[c]),
+                'lon': float(level.lon[c]),
+                'count': int(level.counts[c]),
+                'types': types
+            })
+        return clusters
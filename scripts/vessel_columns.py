@@ -0,0 +1,112 @@
+import struct
+import numpy as np
+from typing import Dict, List
+
+# Binary columnar encoding of vessel summaries (see ships.vessel_summary).
+#
+# Layout, all little-endian, every section 4-byte aligned:
+#   header   4s  magic b'VSL1'
+#            u32 row count N
+#            u32 string dictionary size S (entry 0 is always null)
+#            u32 byte length of the UTF-8 string blob B
+#   columns  one array of N values per entry in COLUMNS, in that order.
+#            u32 columns use 0 for missing, f32 columns use NaN, and
+#            'str' columns hold u32 indices into the string dictionary
+#   strings  u32[S + 1] byte offsets into the blob, then the B-byte blob
+#            (string i is blob[offsets[i]:offsets[i + 1]])
+#
+# Decoders read f32 values back as the shortest decimal that rounds to the
+# same float32, so 12.3 comes back as 12.3 rather than 12.300000190734863.
+#
+# static/vessel_tracking.js (decodeVesselColumns) mirrors this layout.
+
+VESSEL_COLUMNS_MIMETYPE = 'application/x-vessel-columns'
+MAGIC = b'VSL1'
+
+COLUMNS = [
+    ('mmsi', 'u32'),
+    ('imo', 'u32'),
+    ('timeSecUtc', 'u32'),
+    ('latitude', 'f32'),
+    ('longitude', 'f32'),
+    ('speedKmh', 'f32'),
+    ('bearingDeg', 'f32'),
+    ('draughtMeters', 'f32'),
+    ('lengthMeters', 'f32'),
+    ('widthMeters', 'f32'),
+    ('boatName', 'str'),
+    ('country', 'str'),
+    ('vesselType', 'str'),
+    ('destinationName', 'str'),
+]
+
+def _column_value(vessel: Dict, name: str):
+    if name in ('latitude', 'longitude'):
+        return (vessel.get('point') or {}).get(name)
+    return vessel.get(name)
+
+def _as_uint(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _as_float(value) -> float:
+    try:
+        return float('nan') if value is None else float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def encode_vessels(vessels: List[Dict]) -> bytes:
+    strings = {None: 0}
+    parts = []
+    for name, kind in COLUMNS:
+        values = [_column_value(vessel, name) for vessel in vessels]
+        if kind == 'u32':
+            column = np.array([_as_uint(v) for v in values], dtype=np.int64)
+            column = np.where((column < 0) | (column > 0xFFFFFFFF), 0, column).astype('<u4')
+        elif kind == 'f32':
+            column = np.array([_as_float(v) for v in values], dtype='<f4')
+        else:
+            column = np.array([strings.setdefault(v or None, len(strings)) for v in values], dtype='<u4')
+        parts.append(column.tobytes())
+
+    encoded = [b''] + [str(s).encode('utf-8') for s in list(strings)[1:]]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(s) for s in encoded])
+    blob = b''.join(encoded)
+
+    header = MAGIC + struct.pack('<III', len(vessels), len(encoded), len(blob))
+    return header + b''.join(parts) + offsets.tobytes() + blob
+
+def decode_vessels(data: bytes) -> List[Dict]:
+    """Inverse of encode_vessels, for Python clients and tooling."""
+    if data[:4] != MAGIC:
+        raise ValueError('Not a vessel columns payload')
+    n, n_strings, blob_len = struct.unpack_from('<III', data, 4)
+    pos = 16
+    columns = {}
+    for name, kind in COLUMNS:
+        dtype = '<f4' if kind == 'f32' else '<u4'
+        columns[name] = np.frombuffer(data, dtype=dtype, count=n, offset=pos)
+        pos += 4 * n
+    offsets = np.frombuffer(data, dtype='<u4', count=n_strings + 1, offset=pos)
+    pos += 4 * (n_strings + 1)
+    blob = data[pos:pos + blob_len]
+    strings = [None] + [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(1, n_strings)]
+
+    vessels = []
+    for row in range(n):
+        vessel = {}
+        for name, kind in COLUMNS:
+            value = columns[name][row]
+            if kind == 'str':
+                vessel[name] = strings[value]
+            elif kind == 'u32':
+                vessel[name] = int(value) or None
+            else:
+                # numpy prints the shortest repr that round-trips as float32
+                vessel[name] = None if np.isnan(value) else float(str(value))
+        vessel['point'] = {'latitude': vessel.pop('latitude'), 'longitude': vessel.pop('longitude')}
+        vessels.append(vessel)
+    return vessels
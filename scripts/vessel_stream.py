@@ -0,0 +1,133 @@
+import logging
+import json
+import time
+from typing import Dict, List, Tuple
+from collision_detection import collision_detector, collision_to_dict, vessels_from_reports
+from snapshot_cache import snapshot_cache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# A vessel counts as moved once its position shifts more than this (~10 m)
+MOVE_EPSILON_DEG = 1e-4
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+def stream_ndjson(vessels):
+    """Encode an iterable of vessels as newline-delimited JSON.
+
+    Headers are already sent once the first line goes out, so a failure
+    mid-stream is reported as a final {"error": ...} line.
+    """
+    try:
+        for vessel in vessels:
+            yield json.dumps(vessel, separators=(',', ':')) + '\n'
+    except Exception as e:
+        logger.error("Error streaming vessels: %s", e)
+        yield json.dumps({'error': str(e)}) + '\n'
+    finally:
+        if hasattr(vessels, 'close'):
+            vessels.close()
+
+def _vessel_key(vessel: Dict) -> Tuple:
+    point = vessel.get('point') or {}
+    return (point.get('latitude'), point.get('longitude'), vessel.get('speedKmh'), vessel.get('bearingDeg'))
+
+def _has_moved(old: Tuple, new: Tuple) -> bool:
+    if old[2:] != new[2:]:
+        return True
+    try:
+        return abs(old[0] - new[0]) > MOVE_EPSILON_DEG or abs(old[1] - new[1]) > MOVE_EPSILON_DEG
+    except TypeError:
+        return old[:2] != new[:2]
+
+def diff_vessels(previous: Dict, vessels: List[Dict]):
+    """Compare vessel summaries against the state last sent to a client.
+
+    Returns (added, moved, removed, state) where moved entries only carry
+    the fields that change between fixes.
+    """
+    state = {}
+    added, moved = [], []
+    for vessel in vessels:
+        mmsi = vessel.get('mmsi')
+        if mmsi is None:
+            continue
+        key = _vessel_key(vessel)
+        state[mmsi] = key
+        old = previous.get(mmsi)
+        if old is None:
+            added.append(vessel)
+        elif _has_moved(old, key):
+            moved.append({
+                'mmsi': mmsi,
+                'point': vessel.get('point'),
+                'speedKmh': vessel.get('speedKmh'),
+                'bearingDeg': vessel.get('bearingDeg'),
+                'timeSecUtc': vessel.get('timeSecUtc')
+            })
+    removed = [mmsi for mmsi in previous if mmsi not in state]
+    return added, moved, removed, state
+
+def stream_vessel_deltas(fetch_vessels, interval_sec=None, max_duration_sec=None, seed=None, bounds=None):
+    """Generate SSE messages for one subscribed bbox.
+
+    fetch_vessels() returns the current vessel summaries in the box, or
+    None once the stream should end. Without a seed the first message is a
+    full snapshot; with one (the vessels the client already loaded) the
+    stream waits an interval and starts with a delta against it. After
+    that only added, moved and removed vessels and newly raised collision
+    alerts are sent. Snapshot and delta messages carry the stream's
+    snapshot_id, one cache entry kept at the vessels as they now stand,
+    for follow-up endpoints.
+    """
+    interval_sec = interval_sec or Config.VESSEL_STREAM_INTERVAL_SEC
+    max_duration_sec = max_duration_sec or Config.VESSEL_STREAM_MAX_SEC
+    started = time.time()
+    state = diff_vessels({}, seed)[3] if seed is not None else {}
+    alerted = set()
+    first = seed is None
+    snapshot_id = None
+    if seed is not None:
+        yield ": seeded\n\n"
+        time.sleep(interval_sec)
+
+    while time.time() - started < max_duration_sec:
+        try:
+            vessels = fetch_vessels()
+        except Exception as e:
+            logger.error("Error refreshing vessel stream: %s", e)
+            yield format_sse('error', {'error': str(e)})
+            time.sleep(interval_sec)
+            continue
+        if vessels is None:
+            yield format_sse('end', {'reason': 'not_covered'})
+            return
+
+        added, moved, removed, state = diff_vessels(state, vessels)
+        if first:
+            snapshot_id = snapshot_cache.replace(snapshot_id, vessels, bounds)
+            yield format_sse('snapshot', {'count': len(vessels), 'vessels': vessels, 'snapshot_id': snapshot_id})
+            first = False
+        elif added or moved or removed:
+            snapshot_id = snapshot_cache.replace(snapshot_id, vessels, bounds)
+            yield format_sse('delta', {'added': added, 'moved': moved, 'removed': removed, 'snapshot_id': snapshot_id})
+        else:
+            yield ": keepalive\n\n"
+
+        new_alerts = []
+        current_pairs = set()
+        for collision in collision_detector.detect_collisions(vessels_from_reports(vessels)):
+            pair = tuple(sorted((str(collision.vessel_a.mmsi), str(collision.vessel_b.mmsi))))
+            current_pairs.add(pair)
+            if pair not in alerted:
+                new_alerts.append(collision_to_dict(collision))
+        # Forget pairs that cleared so they alert again if they re-converge
+        alerted = current_pairs
+        if new_alerts:
+            yield format_sse('collisions', new_alerts)
+
+        time.sleep(interval_sec)
+
+    yield format_sse('end', {'reason': 'max_duration'})
@@ -0,0 +1,325 @@
+import threading
+import time
+import uuid
+import numpy as np
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from config import Config
+from dead_reckoning import project_positions
+from spatial_index import GridIndex
+from vessel_clusters import VesselClusters
+from destination_index import DestinationIndex
+
+class VesselRecord:
+    """Latest AIS fix for one MMSI."""
+    __slots__ = (
+        'mmsi', 'boat_name', 'country', 'vessel_type', 'lat', 'lon',
+        'destination_name', 'speed_kmh', 'bearing_deg', 'draught_meters',
+        'length_meters', 'width_meters', 'imo', 'call_sign', 'time_sec_utc',
+        'eta_sec_utc', 'seen_at'
+    )
+
+    def __init__(self, report: Dict, seen_at: float):
+        point = report.get('point') or {}
+        self.mmsi = report.get('mmsi')
+        self.boat_name = (report.get('boatName') or '').upper()
+        self.country = report.get('country')
+        self.vessel_type = report.get('vesselType')
+        self.lat = point.get('latitude', 0.0)
+        self.lon = point.get('longitude', 0.0)
+        self.destination_name = (report.get('destinationName') or '').upper()
+        self.speed_kmh = report.get('speedKmh')
+        self.bearing_deg = report.get('bearingDeg')
+        self.draught_meters = report.get('draughtMeters')
+        self.length_meters = report.get('lengthMeters')
+        self.width_meters = report.get('widthMeters')
+        self.imo = report.get('imo')
+        self.call_sign = report.get('callSign')
+        self.time_sec_utc = report.get('timeSecUtc')
+        self.eta_sec_utc = report.get('etaSecUtc')
+        self.seen_at = seen_at
+
+    def to_report(self, lat: Optional[float] = None, lon: Optional[float] = None,
+                  ref_time: Optional[float] = None) -> Dict:
+        report = {
+            'boatName': self.boat_name,
+            'mmsi': self.mmsi,
+            'country': self.country,
+            'vesselType': self.vessel_type,
+            'point': {
+                'latitude': self.lat if lat is None else lat,
+                'longitude': self.lon if lon is None else lon
+            },
+            'destinationName': self.destination_name,
+            'speedKmh': self.speed_kmh,
+            'bearingDeg': self.bearing_deg,
+            'draughtMeters': self.draught_meters,
+            'lengthMeters': self.length_meters,
+            'widthMeters': self.width_meters,
+            'imo': self.imo,
+            'callSign': self.call_sign,
+            'timeSecUtc': self.time_sec_utc,
+            'etaSecUtc': self.eta_sec_utc
+        }
+        if ref_time is not None:
+            # Projected position in point, the AIS fix kept alongside it
+            report['reportedPoint'] = {'latitude': self.lat, 'longitude': self.lon}
+            report['reportedTimeSecUtc'] = self.time_sec_utc
+            report['timeSecUtc'] = int(ref_time)
+        return report
+
+def _merge_reports(records: Dict[int, VesselRecord], reports: List[Dict], seen_at: float) -> bool:
+    """Keep the newest fix per MMSI in records; True if any record changed."""
+    changed = False
+    for report in reports:
+        try:
+            mmsi = int(report.get('mmsi') or 0)
+        except (TypeError, ValueError):
+            continue
+        point = report.get('point') or {}
+        if not mmsi or point.get('latitude', 0) == 0.0 or point.get('longitude', 0) == 0.0:
+            continue
+        current = records.get(mmsi)
+        if current is not None and (current.time_sec_utc or 0) > (report.get('timeSecUtc') or 0):
+            continue
+        records[mmsi] = VesselRecord(report, seen_at)
+        changed = True
+    return changed
+
+def _float_column(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+class VesselSnapshot:
+    """Immutable struct-of-arrays view of the vessel table at one version.
+
+    Row i of every column describes records[i]. Snapshots are never mutated;
+    the table swaps in a new one after each ingestion pass. Clients see the
+    version as token, which also names the table epoch it came from.
+    """
+
+    def __init__(self, records: List[VesselRecord], version: int, built_at: float, epoch: str = ''):
+        self.version = version
+        self.token = f"{epoch}.{version}"
+        self.built_at = built_at
+        self.records = records
+        self.row_of = {rec.mmsi: row for row, rec in enumerate(records)}
+
+        self.mmsi = np.array([rec.mmsi or 0 for rec in records], dtype=np.int64)
+        self.lat = _float_column(rec.lat for rec in records)
+        self.lon = _float_column(rec.lon for rec in records)
+        self.speed_kmh = _float_column(rec.speed_kmh for rec in records)
+        self.bearing_deg = _float_column(rec.bearing_deg for rec in records)
+        self.length_meters = _float_column(rec.length_meters for rec in records)
+        self.time_sec_utc = _float_column(rec.time_sec_utc for rec in records)
+
+        # Vessel types are dictionary-encoded so type filters compare small ints
+        self.type_names = sorted({rec.vessel_type or '' for rec in records})
+        type_code = {name: code for code, name in enumerate(self.type_names)}
+        self.type_code = np.array([type_code[rec.vessel_type or ''] for rec in records], dtype=np.int16)
+
+        self.index = GridIndex(self.lat, self.lon)
+        self._clusters = None
+        self._clusters_lock = threading.Lock()
+        self._destinations = None
+        self._destinations_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def clusters(self) -> VesselClusters:
+        # Built on first use and shared by every request against this version
+        with self._clusters_lock:
+            if self._clusters is None:
+                self._clusters = VesselClusters(self)
+            return self._clusters
+
+    def destinations(self) -> DestinationIndex:
+        with self._destinations_lock:
+            if self._destinations is None:
+                self._destinations = DestinationIndex(self)
+            return self._destinations
+
+    def moving_rows(self, rows: np.ndarray) -> np.ndarray:
+        speeds = self.speed_kmh[rows]
+        return rows[np.nan_to_num(speeds, nan=0.0) > 0]
+
+    def filter_rows(self, rows: np.ndarray, vessel_types: Optional[List[str]] = None,
+                    moving_only: bool = False, limit: int = 0) -> np.ndarray:
+        if vessel_types:
+            codes = [code for code, name in enumerate(self.type_names) if name in vessel_types]
+            rows = rows[np.isin(self.type_code[rows], codes)]
+        if moving_only:
+            rows = self.moving_rows(rows)
+        if limit and limit > 0:
+            rows = rows[:limit]
+        return rows
+
+    def query_bbox(self, sw_lat: float, sw_lon: float, ne_lat: float, ne_lon: float, **filters) -> np.ndarray:
+        return self.filter_rows(self.index.query_bbox(sw_lat, sw_lon, ne_lat, ne_lon), **filters)
+
+    def query_radius(self, lat: float, lon: float, radius_km: float, **filters) -> np.ndarray:
+        return self.filter_rows(self.index.query_radius(lat, lon, radius_km), **filters)
+
+    def query_polygon(self, polygon, **filters) -> np.ndarray:
+        return self.filter_rows(self.index.query_polygon(polygon), **filters)
+
+    def to_reports(self, rows, ref_time: Optional[float] = None) -> List[Dict]:
+        """Materialise report dicts for rows, dead-reckoned to ref_time if given."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if ref_time is None:
+            return [self.records[row].to_report() for row in rows]
+
+        lats, lons = project_positions(
+            self.lat[rows], self.lon[rows], self.speed_kmh[rows],
+            self.bearing_deg[rows], self.time_sec_utc[rows], ref_time=ref_time
+        )
+        return [
+            self.records[row].to_report(float(lat), float(lon), ref_time)
+            for row, lat, lon in zip(rows, lats, lons)
+        ]
+
+class VesselTable:
+    """MMSI-keyed store of the latest fix per vessel plus ingestion coverage.
+
+    Versions count up per process, so each table has a random epoch that
+    goes into version tokens; a token from another worker or an earlier
+    run never matches a local version.
+    """
+
+    def __init__(self, max_age_sec: int = None):
+        self.max_age_sec = max_age_sec or Config.SHIP_MAX_AGE
+        self.epoch = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._records: Dict[int, VesselRecord] = {}
+        self._dirty = False
+        self._coverage: Dict[str, Tuple[Tuple[float, float, float, float], float, bool]] = {}
+        self._version = 0
+        self._rebuild_lock = threading.Lock()
+        # (version, {mmsi: record at the previous version, or None if new})
+        self._diffs = deque(maxlen=Config.VESSEL_DELTA_HISTORY)
+        self.snapshot = VesselSnapshot([], 0, time.time(), self.epoch)
+
+    def upsert_reports(self, reports: List[Dict], seen_at: Optional[float] = None):
+        if seen_at is None:
+            seen_at = time.time()
+        with self._lock:
+            if _merge_reports(self._records, reports, seen_at):
+                self._dirty = True
+
+    def mark_covered(self, region: str, bbox: Tuple[float, float, float, float],
+                     include_stationary: bool, fetched_at: Optional[float] = None):
+        with self._lock:
+            self._coverage[region] = (bbox, fetched_at or time.time(), include_stationary)
+
+    def covers(self, sw_lat: float, sw_lon: float, ne_lat: float, ne_lon: float,
+               include_stationary: bool = False, max_staleness_sec: Optional[float] = None) -> bool:
+        """True if one freshly ingested region contains the whole bbox."""
+        if max_staleness_sec is None:
+            max_staleness_sec = Config.AIS_INGEST_MAX_STALENESS_SEC
+        now = time.time()
+        for (r_sw_lat, r_sw_lon, r_ne_lat, r_ne_lon), fetched_at, stationary in list(self._coverage.values()):
+            if now - fetched_at > max_staleness_sec:
+                continue
+            if include_stationary and not stationary:
+                continue
+            if r_sw_lat <= sw_lat and ne_lat <= r_ne_lat and r_sw_lon <= sw_lon and ne_lon <= r_ne_lon:
+                return True
+        return False
+
+    def rebuild(self) -> VesselSnapshot:
+        """Evict stale fixes and swap in a fresh columnar snapshot."""
+        with self._rebuild_lock:
+            now = time.time()
+            with self._lock:
+                cutoff = now - self.max_age_sec
+                stale = [m for m, rec in self._records.items() if (rec.time_sec_utc or rec.seen_at) < cutoff]
+                for mmsi in stale:
+                    del self._records[mmsi]
+                self._version += 1
+                self._dirty = False
+                records = list(self._records.values())
+                version = self._version
+            snapshot = VesselSnapshot(records, version, now, self.epoch)
+            self._diffs.append((version, self._diff(self.snapshot, snapshot)))
+            self.snapshot = snapshot
+            return snapshot
+
+    def snapshot_of(self, reports: List[Dict]) -> VesselSnapshot:
+        """Standalone snapshot of just these reports, e.g. one fetched box.
+
+        It carries the current version but is not swapped in and adds no
+        diff, so per-request callers get columns, a grid and lazy indexes
+        over their box without rebuilding the whole table.
+        """
+        now = time.time()
+        records: Dict[int, VesselRecord] = {}
+        _merge_reports(records, reports, now)
+        return VesselSnapshot(list(records.values()), self.snapshot.version, now, self.epoch)
+
+    def refresh(self, min_interval_sec: Optional[float] = None) -> VesselSnapshot:
+        """Rebuild only if fixes arrived since the last snapshot and it is at
+        least min_interval_sec old.
+
+        Request paths call this rather than rebuild(), so a burst of upstream
+        fetches costs one rebuild and one diff, not one each.
+        """
+        if min_interval_sec is None:
+            min_interval_sec = Config.VESSEL_REBUILD_MIN_INTERVAL_SEC
+        snapshot = self.snapshot
+        if not self._dirty or time.time() - snapshot.built_at < min_interval_sec:
+            return snapshot
+        return self.rebuild()
+
+    @staticmethod
+    def _diff(old: VesselSnapshot, new: VesselSnapshot) -> Dict[int, Optional[VesselRecord]]:
+        """Previous record of every vessel that was added, changed or removed.
+
+        Records are replaced, never mutated, so the old ones stay as they were.
+        """
+        _, old_rows, new_rows = np.intersect1d(old.mmsi, new.mmsi, assume_unique=True, return_indices=True)
+
+        changed = np.zeros(len(old_rows), dtype=bool)
+        for column in ('lat', 'lon', 'speed_kmh', 'bearing_deg'):
+            a, b = getattr(old, column)[old_rows], getattr(new, column)[new_rows]
+            changed |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+
+        removed = np.setdiff1d(np.arange(len(old)), old_rows, assume_unique=True)
+        added = np.setdiff1d(np.arange(len(new)), new_rows, assume_unique=True)
+
+        previous = {}
+        for row in np.concatenate([old_rows[changed], removed]):
+            previous[int(old.mmsi[row])] = old.records[row]
+        for row in added:
+            previous[int(new.mmsi[row])] = None
+        return previous
+
+    def changes_since(self, since) -> Optional[Dict[int, Optional[VesselRecord]]]:
+        """Vessels touched after version token `since`, mapped to their record
+        at that version (None if new since). None if the token is malformed,
+        from another epoch, or older than the kept history."""
+        epoch, _, version = str(since).rpartition('.')
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        since = int(version)
+        diffs = list(self._diffs)
+        current = diffs[-1][0] if diffs else self.snapshot.version
+        if since == current:
+            return {}
+        if not diffs or since > current or since < diffs[0][0] - 1:
+            return None
+        merged = {}
+        for version, previous in diffs:
+            if version <= since:
+                continue
+            for mmsi, record in previous.items():
+                merged.setdefault(mmsi, record)
+        return merged
+
+    def query_reports(self, sw_lat: float, sw_lon: float, ne_lat: float, ne_lon: float,
+                      moving_only: bool = True, limit: int = 0) -> List[Dict]:
+        snapshot = self.snapshot
+        rows = snapshot.query_bbox(sw_lat, sw_lon, ne_lat, ne_lon, moving_only=moving_only, limit=limit)
+        return snapshot.to_reports(rows, ref_time=time.time())
+
+# Global instance
+vessel_table = VesselTable()
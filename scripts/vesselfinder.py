@@ -0,0 +1,176 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+import aiohttp
+from config import Config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+VF_HEADERS = {
+    'sec-ch-ua-platform': '"Windows"',
+    'Referer': 'https://www.vesselfinder.com/',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36',
+    'sec-ch-ua': '"Not(A:Brand";v="8", "Chromium";v="144", "Brave";v="144"',
+    'sec-ch-ua-mobile': '?0'
+}
+
+_MISSING = object()
+
+def is_valid_mmsi(mmsi) -> bool:
+    """True for a 9-digit MMSI, given as an int or a string of digits."""
+    if isinstance(mmsi, bool):
+        return False
+    if isinstance(mmsi, int):
+        return 100000000 <= mmsi <= 999999999
+    return isinstance(mmsi, str) and len(mmsi) == 9 and mmsi.isascii() and mmsi.isdigit()
+
+class OriginCache:
+    """Origin name per MMSI with a TTL, evicting least recently used entries.
+
+    A vessel with no known origin is cached as None, for a shorter time.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or Config.VESSELFINDER_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, mmsi: str):
+        with self._lock:
+            entry = self._entries.get(mmsi)
+            if entry is not None and entry[1] <= time.time():
+                del self._entries[mmsi]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(mmsi)
+        metrics.cache_lookup('vessel_origin', entry is not None)
+        return _MISSING if entry is None else entry[0]
+
+    def put(self, mmsi: str, origin: Optional[str]):
+        ttl = Config.VESSELFINDER_ORIGIN_TTL_SEC if origin else Config.VESSELFINDER_NO_ORIGIN_TTL_SEC
+        with self._lock:
+            self._entries[mmsi] = (origin, time.time() + ttl)
+            self._entries.move_to_end(mmsi)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class VesselFinderClient:
+    """Long-lived VesselFinder client on its own event loop thread.
+
+    One aiohttp session, and with it one connection pool, serves every
+    request thread. Callers block only on their own lookups; concurrent
+    lookups of the same MMSI share one upstream call. Upstream calls made
+    here are not attributed to the calling request in calls-per-request
+    metrics, since they run on the client's loop.
+    """
+
+    def __init__(self):
+        self.cache = OriginCache()
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='vesselfinder', daemon=True).start()
+                self._loop = loop
+                atexit.register(self.close)
+            return self._loop
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                headers=VF_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=Config.VESSELFINDER_TIMEOUT_SEC),
+                connector=aiohttp.TCPConnector(limit=Config.VESSELFINDER_MAX_CONNECTIONS)
+            )
+            self._semaphore = asyncio.Semaphore(Config.VESSELFINDER_MAX_CONNECTIONS)
+        return self._session
+
+    async def _fetch(self, mmsi: str) -> Optional[str]:
+        session = await self._get_session()
+        url = f"https://www.vesselfinder.com/api/pub/pcext/v4/{mmsi}?d"
+        async with self._semaphore:
+            with metrics.upstream('vesselfinder'):
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    data = await resp.json(content_type=None)
+        if not data:
+            return None
+        dp = data[0].get("dp", "")
+        c = data[0].get("c", "").split(" (")[0]
+        return f"{dp}, {c}" if dp or c else None
+
+    def _fetched(self, mmsi: str, future: asyncio.Future):
+        self._inflight.pop(mmsi, None)
+        # Cached even if every waiter gave up; errors are not cached
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(mmsi, future.result())
+
+    async def _origin(self, mmsi: str) -> Optional[str]:
+        # Lookups that arrive while one is running wait for its answer
+        future = self._inflight.get(mmsi)
+        if future is None:
+            future = self._inflight[mmsi] = asyncio.ensure_future(self._fetch(mmsi))
+            future.add_done_callback(lambda f: self._fetched(mmsi, f))
+        try:
+            return await asyncio.shield(future)
+        except Exception as e:
+            logger.error("Error fetching origin for MMSI %s: %s", mmsi, e)
+            return None
+
+    async def _origins(self, mmsis) -> Dict[str, Optional[str]]:
+        origins = await asyncio.gather(*(self._origin(m) for m in mmsis))
+        return dict(zip(mmsis, origins))
+
+    def get_origins(self, mmsis: Iterable, timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """Origin name per MMSI, fetching the uncached ones concurrently.
+
+        Anything that is not a 9-digit MMSI is skipped, since it goes into
+        the upstream URL path.
+        """
+        mmsis = list(dict.fromkeys(str(m) for m in mmsis if is_valid_mmsi(m)))
+        result = {}
+        missing = []
+        for mmsi in mmsis:
+            cached = self.cache.get(mmsi)
+            if cached is _MISSING:
+                missing.append(mmsi)
+            else:
+                result[mmsi] = cached
+        if missing:
+            future = asyncio.run_coroutine_threadsafe(self._origins(missing), self._ensure_loop())
+            try:
+                result.update(future.result(timeout or Config.VESSELFINDER_BATCH_TIMEOUT_SEC))
+            except Exception as e:
+                future.cancel()
+                logger.error("Error fetching origins for %s vessels: %r", len(missing), e)
+                result.update({m: None for m in missing})
+        return result
+
+    def get_origin(self, mmsi) -> Optional[str]:
+        return self.get_origins([mmsi]).get(str(mmsi))
+
+    def close(self):
+        loop = self._loop
+        if loop is None:
+            return
+        if self._session is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(5)
+            except Exception:
+                pass
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop = None
+
+# Global instance
+vesselfinder = VesselFinderClient()
@@ -1,12 +1,17 @@
+import logging
 import requests
 from datetime import datetime
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 def get_weather_forecast(lat, lon):
     try:
         url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,wind_speed_10m&hourly=temperature_2m,wind_speed_10m&forecast_days=7"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        with metrics.upstream('open_meteo'):
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            data = response.json()
         
         # Process for next 5 days
         times = data['hourly']['time']
@@ -50,5 +55,5 @@ def get_weather_forecast(lat, lon):
         }
         
     except Exception as e:
-        print(f"Weather API error: {e}")
+        logger.error("Weather API error: %s", e)
         return None
\ No newline at end of file
@@ -257,6 +257,80 @@ function checkCalculateButton() {
     calculateButton.disabled = !(originPort && destPort);
 }
 
+// Port search: one request per keystroke fills the datalist, picking a match fills the cascade
+function fillSelect(select, placeholder, items, valueOf, textOf) {
+    select.innerHTML = `<option value="">${placeholder}</option>`;
+    items.forEach(item => {
+        const option = document.createElement('option');
+        option.value = valueOf(item);
+        option.textContent = textOf(item);
+        select.appendChild(option);
+    });
+    select.disabled = false;
+}
+
+function selectSearchedPort(prefix, port) {
+    const countrySelect = document.getElementById(`${prefix}-country`);
+    const portSelect = document.getElementById(`${prefix}-port`);
+    document.getElementById(`${prefix}-water-body`).value = port.water_body;
+    
+    fetch(`/api/countries/${encodeURIComponent(port.water_body)}`)
+        .then(response => response.json())
+        .then(countries => {
+            fillSelect(countrySelect, 'Select Country', countries, c => c, c => c);
+            countrySelect.value = port.country_code;
+            return fetch(`/api/ports/${encodeURIComponent(port.water_body)}/${encodeURIComponent(port.country_code)}`);
+        })
+        .then(response => response.json())
+        .then(ports => {
+            fillSelect(portSelect, 'Select Port', ports, p => p.port_code, p => p.port_name);
+            portSelect.value = port.port_code;
+            checkCalculateButton();
+        })
+        .catch(error => {
+            console.error('Error selecting searched port:', error);
+        });
+}
+
+function setupPortSearch(prefix) {
+    const input = document.getElementById(`${prefix}-port-search`);
+    const options = document.getElementById(`${prefix}-port-options`);
+    let matches = new Map();
+    let searchTimer = null;
+    
+    input.addEventListener('input', function() {
+        const match = matches.get(this.value);
+        if (match) {
+            selectSearchedPort(prefix, match);
+            return;
+        }
+        clearTimeout(searchTimer);
+        const query = this.value.trim();
+        if (!query) return;
+        searchTimer = setTimeout(() => {
+            fetch(`/api/port_search?q=${encodeURIComponent(query)}`)
+                .then(response => response.json())
+                .then(ports => {
+                    matches = new Map();
+                    options.innerHTML = '';
+                    ports.forEach(port => {
+                        const label = `${port.port_name} (${port.port_code}) - ${port.country_code}`;
+                        matches.set(label, port);
+                        const option = document.createElement('option');
+                        option.value = label;
+                        options.appendChild(option);
+                    });
+                })
+                .catch(error => {
+                    console.error('Error searching ports:', error);
+                });
+        }, 150);
+    });
+}
+
+setupPortSearch('origin');
+setupPortSearch('dest');
+
 // Helper function to darken a color for gradient
 function darkenColor(color) {
     if (color === '#2E7D32') return '#76C776'; // Darker light green
@@ -1242,6 +1316,7 @@ function showChokepoints() {
         console.log('All chokepoint ships response:', data);
         
         const allShips = data.ships || {};
+        const snapshotIds = data.snapshot_ids || {};
         
         // Now display chokepoints with ships
         window.currentChokepoints.forEach(cp => {
@@ -1312,12 +1387,18 @@ function showChokepoints() {
                     }
                 });
                 
-                // Check collisions for this chokepoint
-                fetch('/api/chokepoint_collisions', {
+                // Check collisions for this chokepoint, resending the ships only if the snapshot expired
+                const postCollisions = body => fetch('/api/chokepoint_collisions', {
                     method: 'POST',
                     headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({ ships: ships })
-                })
+                    body: JSON.stringify(body)
+                });
+                const request = snapshotIds[cp.name]
+                    ? postCollisions({ snapshot_id: snapshotIds[cp.name] })
+                        .then(res => res.status === 410 ? postCollisions({ ships: ships }) : res)
+                    : postCollisions({ ships: ships });
+
+                request
                 .then(res => res.json())
                 .then(collisions => {
                     if (collisions && collisions.length > 0) {
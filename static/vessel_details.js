@@ -497,6 +497,15 @@ function formatVesselData(vessel) {
             </span>
             <span class="detail-value">${vessel.point?.latitude?.toFixed(4) || 'N/A'}, ${vessel.point?.longitude?.toFixed(4) || 'N/A'}</span>
         </div>
+        ${vessel.nearestPort ? `
+        <div class="vessel-detail-row">
+            <span class="detail-label">
+                At Port
+                <i class="fas fa-info-circle"></i>
+                <span class="info-tooltip">Nearest port when the vessel is within a few kilometres of one</span>
+            </span>
+            <span class="detail-value">${vessel.nearestPort.port_name} (${vessel.nearestPort.port_code}), ${vessel.nearestPort.distance_km} km</span>
+        </div>` : ''}
         <div class="vessel-detail-row">
             <span class="detail-label">
                 Speed
@@ -680,6 +689,60 @@ function toggleAdditionalVesselDetails() {
     }
 }
 
+// Origins still being geocoded are asked for again, backing off, before giving up
+const ORIGIN_RETRY_DELAY_MS = 3000;
+const ORIGIN_MAX_RETRIES = 4;
+
+async function fetchVesselDetails(mmsi, vesselData) {
+    const response = await fetch(`/api/vessel_details/${mmsi}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            vessel_data: vesselData
+        })
+    });
+    
+    const data = await response.json();
+    
+    if (!response.ok || data.error) {
+        throw new Error(data.error || 'Failed to load vessel details');
+    }
+    return data.vessel;
+}
+
+function renderVesselDetails(vessel) {
+    const vesselDetails = formatVesselData(vessel);
+    document.getElementById('vessel-info').innerHTML = vesselDetails.basicInfo;
+    document.getElementById('additional-vessel-details').innerHTML = vesselDetails.additionalInfo;
+}
+
+function retryPendingOrigin(mmsi, vesselData, vesselName, attempt = 1) {
+    setTimeout(async () => {
+        try {
+            const vessel = await fetchVesselDetails(mmsi, vesselData);
+            if (vessel.originStatus === 'pending') {
+                if (attempt < ORIGIN_MAX_RETRIES) {
+                    retryPendingOrigin(mmsi, vesselData, vesselName, attempt + 1);
+                }
+                return;
+            }
+            if (vessel.origin_lat && vessel.origin_lon) {
+                renderVesselDetails(vessel);
+                if (vessel.country) {
+                    await loadCountryFlag(vessel.country);
+                }
+                if (vessel.point && vessel.point.latitude && vessel.point.longitude) {
+                    initializeMap(vessel.point.latitude, vessel.point.longitude, vesselName, vessel);
+                }
+            }
+        } catch (error) {
+            console.error('Error refreshing vessel origin:', error);
+        }
+    }, ORIGIN_RETRY_DELAY_MS * attempt);
+}
+
 async function loadVesselDetails() {
     const mmsi = getMMSIFromURL();
     if (!mmsi) {
@@ -695,35 +758,17 @@ async function loadVesselDetails() {
         }
         
         const vesselData = JSON.parse(vesselDataStr);
-        
-        const response = await fetch(`/api/vessel_details/${mmsi}`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                vessel_data: vesselData
-            })
-        });
-        
-        const data = await response.json();
-        
-        if (!response.ok || data.error) {
-            throw new Error(data.error || 'Failed to load vessel details');
-        }
+        const vessel = await fetchVesselDetails(mmsi, vesselData);
         
         document.getElementById('loading').style.display = 'none';
         
-        const vessel = data.vessel;
         const vesselName = vessel.boatName ? vessel.boatName.replace(/_/g, ' ').trim() : 'Unknown Vessel';
         
         document.getElementById('vessel-name').textContent = vesselName;
         document.getElementById('vessel-name-large').textContent = vesselName;
         document.getElementById('vessel-subtitle').textContent = `MMSI: ${vessel.mmsi || 'N/A'}`;
         
-        const vesselDetails = formatVesselData(vessel);
-        document.getElementById('vessel-info').innerHTML = vesselDetails.basicInfo;
-        document.getElementById('additional-vessel-details').innerHTML = vesselDetails.additionalInfo;
+        renderVesselDetails(vessel);
         
         // Load country flag if available
         if (vessel.country) {
@@ -739,6 +784,11 @@ async function loadVesselDetails() {
         
         document.getElementById('weather-content').classList.remove('show');
         
+        // The origin is still being geocoded; redraw the route once it is known
+        if (vessel.originStatus === 'pending') {
+            retryPendingOrigin(mmsi, vesselData, vesselName);
+        }
+        
     } catch (error) {
         console.error('Error loading vessel details:', error);
         showError(`Failed to load vessel details: ${error.message}`);
@@ -89,6 +89,8 @@ let currentBounds = null;
 let drawingMode = false;
 let drawnRectangle = null;
 let customBounds = null;
+let vesselStream = null;
+let currentSnapshotId = null;
 
 // Visibility state
 let layerVisibility = {
@@ -833,7 +835,8 @@ vesselMarkers.forEach(marker => {
             lat: vesselData.point.latitude,
             lon: vesselData.point.longitude,
             speed_kmh: vesselData.speedKmh,
-            bearing_deg: vesselData.bearingDeg
+            bearing_deg: vesselData.bearingDeg,
+            time_sec_utc: vesselData.timeSecUtc
         });
     }
 });
@@ -859,6 +862,108 @@ fetch('/api/detect_collisions', {
     showResults('Collision Detection', 'Error detecting collisions');
 });
 }
+// Column order and types of the binary vessel format (scripts/vessel_columns.py)
+const VESSEL_COLUMNS = [
+    ['mmsi', 'u32'],
+    ['imo', 'u32'],
+    ['timeSecUtc', 'u32'],
+    ['latitude', 'f32'],
+    ['longitude', 'f32'],
+    ['speedKmh', 'f32'],
+    ['bearingDeg', 'f32'],
+    ['draughtMeters', 'f32'],
+    ['lengthMeters', 'f32'],
+    ['widthMeters', 'f32'],
+    ['boatName', 'str'],
+    ['country', 'str'],
+    ['vesselType', 'str'],
+    ['destinationName', 'str']
+];
+
+// Shortest decimal that rounds to the same float32, so 12.3 is not shown as 12.300000190734863
+function shortestFloat32(value) {
+    for (let digits = 1; digits <= 9; digits++) {
+        const candidate = Number(value.toPrecision(digits));
+        if (Math.fround(candidate) === value) {
+            return candidate;
+        }
+    }
+    return value;
+}
+
+// Function to decode a binary vessel payload into vessel summaries
+function decodeVesselColumns(buffer) {
+    const header = new DataView(buffer, 0, 16);
+    const magic = String.fromCharCode(header.getUint8(0), header.getUint8(1), header.getUint8(2), header.getUint8(3));
+    if (magic !== 'VSL1') {
+        throw new Error('Not a vessel columns payload');
+    }
+    const count = header.getUint32(4, true);
+    const stringCount = header.getUint32(8, true);
+    const blobLength = header.getUint32(12, true);
+
+    let offset = 16;
+    const columns = {};
+    VESSEL_COLUMNS.forEach(([name, kind]) => {
+        columns[name] = kind === 'f32'
+            ? new Float32Array(buffer, offset, count)
+            : new Uint32Array(buffer, offset, count);
+        offset += 4 * count;
+    });
+
+    const stringOffsets = new Uint32Array(buffer, offset, stringCount + 1);
+    offset += 4 * (stringCount + 1);
+    const blob = new Uint8Array(buffer, offset, blobLength);
+    const decoder = new TextDecoder();
+    const strings = [null];
+    for (let i = 1; i < stringCount; i++) {
+        strings.push(decoder.decode(blob.subarray(stringOffsets[i], stringOffsets[i + 1])));
+    }
+
+    const vessels = new Array(count);
+    for (let row = 0; row < count; row++) {
+        const vessel = {};
+        VESSEL_COLUMNS.forEach(([name, kind]) => {
+            const value = columns[name][row];
+            if (kind === 'str') {
+                vessel[name] = strings[value];
+            } else if (kind === 'u32') {
+                vessel[name] = value || null;
+            } else {
+                vessel[name] = Number.isNaN(value) ? null : shortestFloat32(value);
+            }
+        });
+        vessel.point = { latitude: vessel.latitude, longitude: vessel.longitude };
+        delete vessel.latitude;
+        delete vessel.longitude;
+        vessels[row] = vessel;
+    }
+    return vessels;
+}
+
+// Function to read a vessel response in either JSON or the binary columnar format
+function parseVesselResponse(response) {
+    const contentType = response.headers.get('Content-Type') || '';
+    if (!contentType.includes('application/x-vessel-columns')) {
+        return response.json();
+    }
+    return response.arrayBuffer().then(buffer => {
+        const vessels = decodeVesselColumns(buffer);
+        const [sw, ne] = response.headers.get('X-Vessel-Bounds').split(';');
+        const [swLat, swLon] = sw.split(',').map(Number);
+        const [neLat, neLon] = ne.split(',').map(Number);
+        return {
+            success: true,
+            delta: false,
+            version: response.headers.get('X-Vessel-Version'),
+            snapshot_id: response.headers.get('X-Snapshot-Id'),
+            count: vessels.length,
+            vessels: vessels,
+            bounds: { sw_lat: swLat, sw_lon: swLon, ne_lat: neLat, ne_lon: neLon }
+        };
+    });
+}
+
 // Function to show all vessels in selected area
 function showAllVessels() {
     const oceanRegion = document.getElementById('ocean-region').value;
@@ -867,6 +972,8 @@ function showAllVessels() {
     
     const isRedrawing = customBounds && currentBounds;
     
+    stopVesselStream();
+    
     if (!isRedrawing) {
         clearVesselMarkers();
         clearCollisionLines();
@@ -905,15 +1012,18 @@ function showAllVessels() {
     fetch(apiEndpoint, {
         method: 'POST',
         headers: {
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            // Prefer the compact columnar encoding; errors still come back as JSON
+            'Accept': 'application/x-vessel-columns, application/json;q=0.9'
         },
         body: JSON.stringify(requestData)
     })
-    .then(response => response.json())
+    .then(parseVesselResponse)
     .then(data => {
         if (data.success && data.vessels && data.vessels.length > 0) {
             // Store current bounds
             currentBounds = data.bounds;
+            currentSnapshotId = data.snapshot_id || null;
             
             // Add new vessels
             data.vessels.forEach(vessel => {
@@ -941,9 +1051,13 @@ function showAllVessels() {
             countDiv.style.display = 'block';
             
             showResults('Vessel Tracking', `Loaded ${totalVesselCount} vessel(s) total. Use buttons below to check disasters, protected areas, or collisions.`);
+            
+            // Keep the loaded area live with server-pushed deltas
+            startVesselStream(data.bounds, limit, currentSnapshotId);
         } else {
             showResults('Vessel Tracking', 'No vessels found in this area');
             currentBounds = null;
+            currentSnapshotId = null;
         }
         
         btn.innerHTML = originalText;
@@ -957,6 +1071,123 @@ function showAllVessels() {
     });
 }
 
+// Function to stop the live vessel stream
+function stopVesselStream() {
+    if (vesselStream) {
+        vesselStream.close();
+        vesselStream = null;
+    }
+}
+
+// Function to check whether a vessel lies inside the given bounds
+function isInBounds(vessel, bounds) {
+    const lat = vessel.point.latitude;
+    const lon = vessel.point.longitude;
+    return lat >= bounds.sw_lat && lat <= bounds.ne_lat && lon >= bounds.sw_lon && lon <= bounds.ne_lon;
+}
+
+// Function to apply added/moved/removed vessels pushed by the server
+function applyVesselDelta(delta) {
+    const removed = new Set(delta.removed);
+    const updates = new Map(delta.moved.map(update => [update.mmsi, update]));
+    const kept = [];
+
+    vesselMarkers.forEach(marker => {
+        const vesselData = marker.options.vesselData;
+        if (removed.has(vesselData.mmsi)) {
+            if (map.hasLayer(marker)) {
+                map.removeLayer(marker);
+            }
+        } else if (updates.has(vesselData.mmsi)) {
+            // Recreate the marker so its heading and popup follow the new fix
+            const updatedData = Object.assign({}, vesselData, updates.get(vesselData.mmsi));
+            if (map.hasLayer(marker)) {
+                map.removeLayer(marker);
+            }
+            const updatedMarker = createShipMarker(updatedData);
+            updatedMarker.options.vesselData = updatedData;
+            if (layerVisibility.ships) {
+                updatedMarker.addTo(map);
+            }
+            kept.push(updatedMarker);
+        } else {
+            kept.push(marker);
+        }
+    });
+
+    delta.added.forEach(vessel => {
+        const marker = createShipMarker(vessel);
+        marker.options.vesselData = vessel;
+        if (layerVisibility.ships) {
+            marker.addTo(map);
+        }
+        kept.push(marker);
+    });
+
+    vesselMarkers = kept;
+    document.getElementById('vessel-count-text').textContent =
+        `${vesselMarkers.length} vessel${vesselMarkers.length !== 1 ? 's' : ''} loaded`;
+}
+
+// Function to subscribe to live vessel updates for the loaded bounds.
+// The server only streams areas it ingests in the background and answers 204 otherwise.
+function startVesselStream(bounds, limit, snapshotId) {
+    stopVesselStream();
+    if (!window.EventSource || !bounds) {
+        return;
+    }
+
+    const params = new URLSearchParams({
+        sw_lat: bounds.sw_lat,
+        sw_lon: bounds.sw_lon,
+        ne_lat: bounds.ne_lat,
+        ne_lon: bounds.ne_lon,
+        limit: limit || 0
+    });
+    // The server starts from the vessels already on the map instead of resending them
+    if (snapshotId) {
+        params.set('snapshot_id', snapshotId);
+    }
+    const stream = new EventSource(`/api/vessel_stream?${params}`);
+    vesselStream = stream;
+
+    // A refused stream (204) closes for good; drop the handle so nothing waits on it
+    stream.addEventListener('error', () => {
+        if (stream.readyState === EventSource.CLOSED && vesselStream === stream) {
+            vesselStream = null;
+        }
+    });
+
+    // Unseeded streams diff against their first snapshot, so reconcile the markers with it once
+    vesselStream.addEventListener('snapshot', event => {
+        const snapshot = JSON.parse(event.data);
+        // The server's copy of what the map now shows, for follow-up requests
+        currentSnapshotId = snapshot.snapshot_id || null;
+        const present = new Set(vesselMarkers.map(marker => marker.options.vesselData.mmsi));
+        const incoming = new Set(snapshot.vessels.map(vessel => vessel.mmsi));
+        applyVesselDelta({
+            added: snapshot.vessels.filter(vessel => !present.has(vessel.mmsi)),
+            moved: snapshot.vessels.filter(vessel => present.has(vessel.mmsi)),
+            removed: vesselMarkers
+                .map(marker => marker.options.vesselData)
+                .filter(vessel => !incoming.has(vessel.mmsi) && isInBounds(vessel, bounds))
+                .map(vessel => vessel.mmsi)
+        });
+    });
+
+    vesselStream.addEventListener('delta', event => {
+        const delta = JSON.parse(event.data);
+        currentSnapshotId = delta.snapshot_id || null;
+        applyVesselDelta(delta);
+    });
+
+    vesselStream.addEventListener('collisions', event => {
+        addCollisionLines(currentCollisions.concat(JSON.parse(event.data)));
+    });
+
+    vesselStream.addEventListener('end', stopVesselStream);
+}
+
 // Function to check disasters in current area
 function checkDisastersInArea() {
     if (!currentBounds) {
@@ -972,7 +1203,7 @@ function checkDisastersInArea() {
         headers: {
             'Content-Type': 'application/json'
         },
-        body: JSON.stringify(currentBounds)
+        body: JSON.stringify(Object.assign({ snapshot_id: currentSnapshotId }, currentBounds))
     })
     .then(response => response.json())
     .then(data => {
@@ -1030,18 +1261,27 @@ function detectCollisions() {
                 lat: vesselData.point.latitude,
                 lon: vesselData.point.longitude,
                 speed_kmh: vesselData.speedKmh,
-                bearing_deg: vesselData.bearingDeg
+                bearing_deg: vesselData.bearingDeg,
+                time_sec_utc: vesselData.timeSecUtc
             });
         }
     });
 
-    fetch('/api/detect_collisions', {
+    const postCollisions = body => fetch('/api/detect_collisions', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
         },
-        body: JSON.stringify({ vessels: vessels })
-    })
+        body: JSON.stringify(body)
+    });
+
+    // Send the snapshot handle when the map still matches it, and the vessels themselves if it expired
+    const request = currentSnapshotId
+        ? postCollisions({ snapshot_id: currentSnapshotId })
+            .then(response => response.status === 410 ? postCollisions({ vessels: vessels }) : response)
+        : postCollisions({ vessels: vessels });
+
+    request
     .then(response => response.json())
     .then(collisions => {
         if (collisions && collisions.length > 0) {
@@ -1078,7 +1318,7 @@ function checkEcaMpaInArea() {
         headers: {
             'Content-Type': 'application/json'
         },
-        body: JSON.stringify(currentBounds)
+        body: JSON.stringify(Object.assign({ snapshot_id: currentSnapshotId }, currentBounds))
     })
     .then(response => response.json())
     .then(data => {